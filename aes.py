@@ -1,8 +1,15 @@
 import os
+import struct
 from Crypto.Cipher import AES
 from Crypto.Random import get_random_bytes
 import base64
 
+STREAM_MAGIC = b'AESG'
+STREAM_VERSION = 1
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_HEADER = struct.Struct('>4sBI7s')
+TAG_SIZE = 16
+
 
 class AESHandler:
     def __init__(self, keys_directory, key_size):
@@ -54,3 +61,105 @@ class AESHandler:
         cipher = AES.new(key, AES.MODE_CBC, iv)
         decrypted_data = cipher.decrypt(ciphertext)
         return AESHandler.unpad(decrypted_data).decode('utf-8')
+
+    @staticmethod
+    def encrypt_stream(source, key, chunk_size=STREAM_CHUNK_SIZE):
+        if chunk_size <= 0:
+            raise ValueError(f"Stream chunk size must be positive, got {chunk_size}.")
+
+        nonce_prefix = get_random_bytes(7)
+        header = STREAM_HEADER.pack(STREAM_MAGIC, STREAM_VERSION, chunk_size, nonce_prefix)
+        yield header
+
+        buffer = bytearray()
+        counter = 0
+
+        for piece in AESHandler._iter_source(source):
+            buffer += piece
+            while len(buffer) > chunk_size:
+                yield AESHandler._seal_chunk(key, header, nonce_prefix, counter, buffer[:chunk_size], False)
+                del buffer[:chunk_size]
+                counter += 1
+
+        yield AESHandler._seal_chunk(key, header, nonce_prefix, counter, buffer, True)
+
+    @staticmethod
+    def decrypt_stream(source, key):
+        reader = _StreamReader(AESHandler._iter_source(source))
+
+        header = reader.read(STREAM_HEADER.size)
+        if len(header) != STREAM_HEADER.size:
+            raise ValueError("Truncated AES stream header.")
+
+        magic, version, chunk_size, nonce_prefix = STREAM_HEADER.unpack(header)
+        if magic != STREAM_MAGIC or version != STREAM_VERSION or chunk_size <= 0:
+            raise ValueError("Unsupported AES stream format.")
+
+        record_size = chunk_size + TAG_SIZE
+        record = reader.read(record_size)
+        counter = 0
+
+        while True:
+            next_record = reader.read(record_size)
+            final = not next_record
+            yield AESHandler._open_chunk(key, header, nonce_prefix, counter, record, final)
+
+            if final:
+                return
+
+            record = next_record
+            counter += 1
+
+    @staticmethod
+    def _iter_source(source):
+        if isinstance(source, str):
+            source = source.encode('utf-8')
+
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            yield source
+        elif hasattr(source, 'read'):
+            while True:
+                piece = source.read(STREAM_CHUNK_SIZE)
+                if not piece:
+                    return
+                yield piece
+        else:
+            yield from source
+
+    @staticmethod
+    def _chunk_nonce(nonce_prefix, counter, final):
+        return nonce_prefix + struct.pack('>IB', counter, int(final))
+
+    @staticmethod
+    def _seal_chunk(key, header, nonce_prefix, counter, chunk, final):
+        cipher = AES.new(key, AES.MODE_GCM, nonce=AESHandler._chunk_nonce(nonce_prefix, counter, final))
+        cipher.update(header)
+        ciphertext, tag = cipher.encrypt_and_digest(chunk)
+        return ciphertext + tag
+
+    @staticmethod
+    def _open_chunk(key, header, nonce_prefix, counter, record, final):
+        if len(record) < TAG_SIZE:
+            raise ValueError("Truncated AES stream chunk.")
+
+        cipher = AES.new(key, AES.MODE_GCM, nonce=AESHandler._chunk_nonce(nonce_prefix, counter, final))
+        cipher.update(header)
+        record = memoryview(record)
+        return cipher.decrypt_and_verify(record[:-TAG_SIZE], record[-TAG_SIZE:])
+
+
+class _StreamReader:
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.buffer = bytearray()
+
+    def read(self, size):
+        while len(self.buffer) < size:
+            piece = next(self.pieces, None)
+            if piece is None:
+                break
+            self.buffer += piece
+
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
@@ -0,0 +1,30 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+UMASK = os.umask(0)
+os.umask(UMASK)
+FILE_MODE = 0o666 & ~UMASK
+
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+
+    try:
+        with os.fdopen(descriptor, mode) as f:
+            yield f
+        os.chmod(temporary_path, target_mode(path))
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.unlink(temporary_path)
+        raise
+
+
+def target_mode(path):
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        return FILE_MODE
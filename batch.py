@@ -0,0 +1,249 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import main
+from atomic import FILE_MODE, atomic_write
+from dwt import DWT
+
+DWT_LEVEL = 1
+HASH_CHUNK = 1 << 20
+COVER_EXTENSIONS = (".png", ".bmp", ".tif", ".tiff", ".jpg", ".jpeg")
+
+
+def build_jobs(images, methods, message, artifacts=False):
+    return [(image_name, method, message, artifacts) for method in methods for image_name in images]
+
+
+def init_worker(trace=False, wavelet=None, q_step=None, memory=False, threads=None):
+    if trace:
+        main.TRACER.enable()
+    if memory:
+        main.PROFILER.enable()
+
+    if wavelet is not None or q_step is not None:
+        current = main.dwt_processor()
+        main.DWT = DWT(wavelet or current.wavelet, q_step or current.q_step)
+    main.set_threads(threads)
+
+    main.KEYS.rsa_cipher(main.RSA_PUBLIC_KEY)
+    main.KEYS.rsa_cipher(main.RSA_PRIVATE_KEY)
+    main.KEYS.aes_key(main.AES_KEY)
+
+
+def run_job(job):
+    image_name, method, message, artifacts = job
+    records = []
+
+    main.paper_embedding_process(
+        message,
+        *main.image_paths(image_name, method),
+        method,
+        metrics_writer=lambda **record: records.append(record),
+        artifacts=artifacts,
+    )
+
+    return records[0], main.TRACER.drain()
+
+
+def iter_covers(pattern):
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "**", "*")
+
+    for path in glob.iglob(pattern, recursive=True):
+        if path.lower().endswith(COVER_EXTENSIONS) and os.path.isfile(path):
+            yield path
+
+
+def cover_digest(cover_path):
+    digest = hashlib.sha256()
+    with open(cover_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def job_key(digest, method, message, wavelet, q_step, level=DWT_LEVEL):
+    payload_digest = hashlib.sha256(message.encode("utf-8")).hexdigest()
+    config = json.dumps([digest, method, wavelet, q_step, level, payload_digest])
+    return hashlib.sha256(config.encode()).hexdigest()
+
+
+def record_key(key, cover_path):
+    return f"{key}:{cover_path}"
+
+
+def result_paths(output_dir, key):
+    directory = os.path.join(output_dir, key[:2])
+    base = os.path.join(directory, key)
+    return directory, f"{base}.json", f"{base}.png", f"{base}_binary.png", f"{base}_compressed.png"
+
+
+def iter_cached_jobs(covers, methods, message, output_dir, artifacts, wavelet, q_step):
+    for cover_path in covers:
+        digest = cover_digest(cover_path)
+        for method in methods:
+            key = job_key(digest, method, message, wavelet, q_step)
+            yield cover_path, method, message, output_dir, artifacts, key
+
+
+def run_cached_job(job):
+    cover_path, method, message, output_dir, artifacts, key = job
+    directory, marker_path, embedded_image_path, binary_image_path, compressed_image_path = result_paths(output_dir, key)
+
+    if os.path.exists(marker_path) and os.path.exists(embedded_image_path):
+        try:
+            with open(marker_path) as f:
+                record = json.load(f)
+            return {**record, "cover": cover_path, "key": record_key(key, cover_path)}, [], False
+        except ValueError:
+            pass
+
+    os.makedirs(directory, exist_ok=True)
+    records = []
+
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=f".{key}.", suffix=".png")
+    os.close(descriptor)
+    try:
+        main.paper_embedding_process(
+            message,
+            cover_path,
+            temporary_path,
+            binary_image_path,
+            compressed_image_path,
+            method,
+            metrics_writer=lambda **record: records.append(record),
+            artifacts=artifacts,
+        )
+        os.chmod(temporary_path, FILE_MODE)
+        os.replace(temporary_path, embedded_image_path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.unlink(temporary_path)
+        raise
+
+    record = {**records[0], "cover": cover_path, "key": key}
+
+    with atomic_write(marker_path) as f:
+        json.dump(record, f, indent=4)
+
+    return {**record, "key": record_key(key, cover_path)}, main.TRACER.drain(), True
+
+
+def run_directory(covers, methods, message, output_dir, workers=None, metrics_writer=main.save_metrics,
+                  artifacts=False, trace=False, wavelet=None, q_step=None, memory=False, threads=None):
+    workers = workers or os.cpu_count() or 1
+    counts = {"computed": 0, "skipped": 0}
+    events = []
+
+    dwt = main.dwt_processor()
+    jobs = iter_cached_jobs(covers, methods, message, output_dir, artifacts, wavelet or dwt.wavelet,
+                            q_step or dwt.q_step)
+
+    def collect(result):
+        record, job_events, computed = result
+
+        metrics_writer(**record)
+        events.extend(job_events)
+        counts["computed" if computed else "skipped"] += 1
+
+    if workers == 1:
+        init_worker(trace, wavelet, q_step, memory, threads)
+        for job in jobs:
+            collect(run_cached_job(job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(trace, wavelet, q_step, memory, threads)) as executor:
+            pending = {}
+            waiting = {}
+
+            def submit(job):
+                pending[executor.submit(run_cached_job, job)] = job
+
+            def drain():
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = pending.pop(future)
+                    collect(future.result())
+                    # Jobs that share a key with one in flight run once it is cached, so they only read its marker.
+                    for duplicate in waiting.pop(job[-1], []):
+                        submit(duplicate)
+
+            for job in jobs:
+                if job[-1] in waiting:
+                    waiting[job[-1]].append(job)
+                    continue
+
+                waiting[job[-1]] = []
+                submit(job)
+                if len(pending) >= workers * 4:
+                    drain()
+
+            while pending:
+                drain()
+
+    main.TRACER.extend(events)
+    return counts
+
+
+def run_batch(jobs, workers=None, metrics_writer=main.save_metrics, trace=False, wavelet=None, q_step=None,
+              memory=False, threads=None):
+    workers = workers or os.cpu_count() or 1
+    events = []
+
+    if workers == 1:
+        init_worker(trace, wavelet, q_step, memory, threads)
+        results = map(run_job, jobs)
+        for record, job_events in results:
+            metrics_writer(**record)
+            events.extend(job_events)
+    else:
+        chunksize = max(1, len(jobs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(trace, wavelet, q_step, memory, threads)) as executor:
+            for record, job_events in executor.map(run_job, jobs, chunksize=chunksize):
+                metrics_writer(**record)
+                events.extend(job_events)
+
+    main.TRACER.extend(events)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the image x method embedding matrix on a process pool.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--images", nargs="+", default=main.IMAGES)
+    parser.add_argument("--methods", nargs="+", default=main.METHODS)
+    parser.add_argument("--message", default=main.MESSAGE)
+    parser.add_argument("--artifacts", action="store_true", help="Also write the binary and DWT intermediate images.")
+    parser.add_argument("--trace", help="Record stage spans and write them as Chrome trace-event JSON to this file.")
+    parser.add_argument("--memory", action="store_true",
+                        help="Record per-stage traced-allocation peaks and RSS deltas with each metrics record.")
+    parser.add_argument("--covers", help="Directory or glob of cover images; enables resumable cached mode.")
+    parser.add_argument("--output-dir", default=os.path.join(main.ROOT_DIRECTORY, "results"),
+                        help="Where cached mode keeps stego images and result markers.")
+    parser.add_argument("--wavelet", default=None, help="DWT wavelet (default: haar).")
+    parser.add_argument("--q-step", type=int, default=None, help="DWT quantization step (default: 25).")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Threads per worker for the Cb/Cr DWT and metrics (default: serial).")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.covers:
+        counts = run_directory(iter_covers(args.covers), args.methods, args.message, args.output_dir, args.workers,
+                               artifacts=args.artifacts, trace=bool(args.trace), wavelet=args.wavelet,
+                               q_step=args.q_step, memory=args.memory, threads=args.threads)
+        print(f"Computed {counts['computed']} jobs, skipped {counts['skipped']} cached jobs")
+    else:
+        run_batch(build_jobs(args.images, args.methods, args.message, args.artifacts), args.workers,
+                  trace=bool(args.trace), wavelet=args.wavelet, q_step=args.q_step, memory=args.memory,
+                  threads=args.threads)
+    main.export_metrics()
+
+    if args.trace:
+        main.TRACER.export_chrome(args.trace)
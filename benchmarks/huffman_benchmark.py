@@ -0,0 +1,71 @@
+# Usage: python -m benchmarks.huffman_benchmark [--sizes 16384 262144] [--repeat 3]
+import argparse
+import os
+import random
+import time
+
+from huffman import CanonicalHuffman, Huffman
+
+WORDS = (
+    "saudacoes cordiais criptografia imagem mensagem chave esteganografia "
+    "compressao wavelet bits pixel canal cifra texto aleatorio"
+).split()
+
+
+def random_ciphertext(size):
+    return os.urandom(size)
+
+
+def text_payload(size):
+    rng = random.Random(size)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)[:size].encode('utf-8')
+
+
+def best_time(function, argument, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(argument)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes, repeat):
+    codecs = [
+        ("huffman", Huffman.encode_packed, Huffman.decode_packed),
+        ("canonical", CanonicalHuffman.encode, CanonicalHuffman.decode),
+    ]
+    payloads = [("ciphertext", random_ciphertext), ("text", text_payload)]
+
+    print(f"{'payload':<12}{'size':>10}  {'codec':<10}{'encoded':>10}{'encode s':>11}{'decode s':>11}{'decode MB/s':>13}")
+    for payload_name, generator in payloads:
+        for size in sizes:
+            data = generator(size)
+            for codec_name, encode, decode in codecs:
+                encode_time, encoded = best_time(encode, data, repeat)
+                decode_time, decoded = best_time(decode, encoded, repeat)
+                if decoded != data:
+                    raise RuntimeError(f"{codec_name} round trip failed for {payload_name} ({size} bytes)")
+
+                throughput = size / decode_time / 1e6
+                print(f"{payload_name:<12}{size:>10}  {codec_name:<10}{len(encoded):>10}"
+                      f"{encode_time:>11.4f}{decode_time:>11.4f}{throughput:>13.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Huffman and CanonicalHuffman throughput.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16384, 262144])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    run(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Usage: python -m benchmarks.import_time [--budget extract=250 main=600] [--repeat 5]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BUDGETS_MS = {
+    "extract": 250.0,
+    "main": 600.0,
+}
+HEAVY_MODULES = ("pywt", "skimage", "sklearn", "scipy")
+
+
+def import_profile(module):
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIRECTORY,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    total_us = 0
+    loaded = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, name = (field.strip() for field in line[len("import time:"):].split("|"))
+        loaded.add(name.split(".")[0])
+        if not line.split("|")[2].startswith("  "):
+            total_us += int(cumulative)
+
+    return total_us / 1e3, loaded
+
+
+def measure(module, repeat):
+    samples = []
+    loaded = set()
+    for _ in range(repeat):
+        total_ms, loaded = import_profile(module)
+        samples.append(total_ms)
+
+    return {
+        "module": module,
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "heavy_modules": sorted(loaded.intersection(HEAVY_MODULES)),
+    }
+
+
+def parse_budget(value):
+    module, _, budget = value.partition("=")
+    return module, float(budget)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fail when cold-start import time exceeds a budget.")
+    parser.add_argument("--budget", type=parse_budget, nargs="+", default=list(BUDGETS_MS.items()),
+                        help="module=milliseconds pairs.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = []
+    failures = []
+
+    for module, budget in args.budget:
+        result = measure(module, args.repeat)
+        result["budget_ms"] = budget
+        results.append(result)
+
+        print(f"{module:<12}{result['median_ms']:>10.1f} ms (budget {budget:.0f} ms) "
+              f"heavy: {', '.join(result['heavy_modules']) or '-'}", file=sys.stderr)
+        if result["median_ms"] > budget:
+            failures.append(module)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    for module in failures:
+        print(f"OVER BUDGET {module}", file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+# Usage: python -m benchmarks.stages [--output results.json] [--baseline baseline.json] [--threshold 0.25]
+#        [--memory] [--memory-budget dwt_compress=64 metric_ssim=32]
+import argparse
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+import main
+from aes import AESHandler
+from bits import BitBuffer
+from compression import Compression
+from container import Container
+from dwt import DWT
+from huffman import CanonicalHuffman
+from lsb import LSB
+from metrics.engine import ImageContext, MetricsEngine, METRICS
+from profiling import PROFILER
+from rsa import RSAHandler
+
+IMAGES_DIRECTORY = os.path.join(main.ROOT_DIRECTORY, "images")
+BUNDLED_IMAGES = main.IMAGES
+SYNTHETIC_SIZES = [256, 1024]
+PAYLOAD_SIZES = [16, 190]
+RSA_MAX_PAYLOAD = 190
+
+
+def measure(function, warmup, repeat):
+    for _ in range(warmup):
+        function()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        function()
+        samples.append((time.perf_counter_ns() - start) / 1e9)
+
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "repeat": repeat,
+    }
+
+
+def measure_memory(stage, function):
+    PROFILER.enable()
+    try:
+        mark = PROFILER.mark()
+        with PROFILER.stage(stage):
+            function()
+        _, traced_peak, rss_delta = PROFILER.records(mark)[-1]
+    finally:
+        PROFILER.disable()
+
+    return {"traced_peak": traced_peak, "rss_delta": rss_delta}
+
+
+def payload_stages(size):
+    message = base64.b64encode(os.urandom(size)).decode()[:size]
+    aes_key = main.KEYS.aes_key(main.AES_KEY)
+    public_key = main.KEYS.rsa_cipher(main.RSA_PUBLIC_KEY)
+    private_key = main.KEYS.rsa_cipher(main.RSA_PRIVATE_KEY)
+
+    codec, compressed = Compression.compress(message)
+    aes_ciphertext = b''.join(AESHandler.encrypt_stream(compressed, aes_key))
+    session_key = os.urandom(32)
+    stream_ciphertext = b''.join(AESHandler.encrypt_stream(compressed, session_key))
+    wrapped_key = RSAHandler.encrypt(session_key, public_key)
+    packed = Container("hybrid", stream_ciphertext, wrapped_key, codec).pack()
+    canonical = CanonicalHuffman.encode(message.encode('utf-8'))
+
+    stages = {
+        "compress": lambda: Compression.compress(message),
+        "decompress": lambda: Compression.decompress(codec, compressed),
+        "aes_encrypt": lambda: b''.join(AESHandler.encrypt_stream(compressed, aes_key)),
+        "aes_decrypt": lambda: b''.join(AESHandler.decrypt_stream(aes_ciphertext, aes_key)),
+        "hybrid_encrypt": lambda: (
+            b''.join(AESHandler.encrypt_stream(compressed, session_key)),
+            RSAHandler.encrypt(session_key, public_key),
+        ),
+        "hybrid_decrypt": lambda: b''.join(
+            AESHandler.decrypt_stream(stream_ciphertext, RSAHandler.decrypt(wrapped_key, private_key))
+        ),
+        "canonical_huffman_encode": lambda: CanonicalHuffman.encode(message.encode('utf-8')),
+        "canonical_huffman_decode": lambda: CanonicalHuffman.decode(canonical),
+        "container_pack": lambda: Container("hybrid", stream_ciphertext, wrapped_key, codec).pack(),
+        "container_read": lambda: Container.read(lambda count: packed[:count]),
+        "bin_to_image": lambda: BitBuffer.from_bytes(packed).plane(main.MESSAGE_PLANE),
+    }
+
+    if size <= RSA_MAX_PAYLOAD:
+        rsa_ciphertext = RSAHandler.encrypt(compressed, public_key)
+        stages["rsa_encrypt"] = lambda: RSAHandler.encrypt(compressed, public_key)
+        stages["rsa_decrypt"] = lambda: RSAHandler.decrypt(rsa_ciphertext, private_key)
+
+    return stages
+
+
+def cover_stages(cover_path, size, dwt, stego_path):
+    payload = Container("aes", os.urandom(size)).pack()
+    message_bits = BitBuffer.from_bytes(payload).plane(main.MESSAGE_PLANE)
+
+    cover = Image.open(cover_path).convert('RGB')
+    compressed = dwt.compress_image(cover, message_bits, save=False)
+    stego = LSB(compressed, payload).apply()
+    stego.save(stego_path)
+
+    stages = {
+        "dwt_compress": lambda: dwt.compress_image(cover, message_bits, save=False),
+        "dwt_extract": lambda: dwt.extract_message_image(stego),
+        "lsb_apply": lambda: LSB(compressed, payload).apply(),
+        "lsb_extract": lambda: Container.read(LSB(stego).read_bytes),
+    }
+
+    for metric in METRICS:
+        engine = MetricsEngine([metric])
+        stages[f"metric_{metric}"] = (
+            lambda engine=engine: engine.calculate(
+                ImageContext(cover_path, cover), ImageContext(stego_path, stego), 1.0
+            )
+        )
+
+    stages["metric_all"] = lambda: MetricsEngine().calculate(
+        ImageContext(cover_path, cover), ImageContext(stego_path, stego), 1.0
+    )
+
+    return stages
+
+
+def synthetic_cover(size, directory):
+    path = os.path.join(directory, f"synthetic_{size}.png")
+    if not os.path.exists(path):
+        rng = np.random.default_rng(size)
+        gradient = np.linspace(0, 255, size, dtype=np.float64)
+        base = (gradient[None, :, None] + gradient[:, None, None]) / 2
+        noise = rng.normal(0, 12, (size, size, 3))
+        Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8)).save(path)
+    return path
+
+
+def run(args):
+    os.makedirs(args.work_directory, exist_ok=True)
+    results = []
+
+    def record(stage, cover, payload, function):
+        timing = measure(function, args.warmup, args.repeat)
+        if args.memory:
+            timing.update(measure_memory(stage, function))
+
+        results.append({"stage": stage, "cover": cover, "payload": payload, **timing})
+        memory = f"{timing['traced_peak'] / 2 ** 20:>10.2f} MiB" if args.memory else ""
+        print(f"{stage:<28}{cover:<20}{payload:>8}{timing['median'] * 1e3:>12.3f} ms{memory}", file=sys.stderr)
+
+    for size in args.payloads:
+        for stage, function in payload_stages(size).items():
+            record(stage, "-", size, function)
+
+    covers = [(name, os.path.join(IMAGES_DIRECTORY, name)) for name in args.images]
+    covers += [(f"synthetic_{size}", synthetic_cover(size, args.work_directory)) for size in args.sizes]
+
+    dwt = DWT(wavelet=args.wavelet)
+    for cover_name, cover_path in covers:
+        for size in args.payloads:
+            stego_path = os.path.join(args.work_directory, f"stego_{cover_name}_{size}.png")
+            for stage, function in cover_stages(cover_path, size, dwt, stego_path).items():
+                record(stage, cover_name, size, function)
+
+    return results
+
+
+def result_key(result):
+    return f"{result['stage']}|{result['cover']}|{result['payload']}"
+
+
+def compare(results, baseline, threshold):
+    reference = {result_key(result): result for result in baseline}
+    regressions = []
+
+    for result in results:
+        previous = reference.get(result_key(result))
+        if previous is None:
+            continue
+
+        ratio = result["median"] / previous["median"] if previous["median"] else float("inf")
+        result["baseline_median"] = previous["median"]
+        result["ratio"] = ratio
+        if ratio > 1 + threshold:
+            regressions.append(result)
+
+    return regressions
+
+
+def over_budget(results, budgets):
+    return [
+        result for result in results
+        if result["stage"] in budgets and result["traced_peak"] > budgets[result["stage"]] * 2 ** 20
+    ]
+
+
+def parse_budget(value):
+    stage, _, budget = value.partition("=")
+    return stage, float(budget)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time each embedding/extraction stage separately.")
+    parser.add_argument("--images", nargs="*", default=BUNDLED_IMAGES)
+    parser.add_argument("--sizes", type=int, nargs="*", default=SYNTHETIC_SIZES, help="Synthetic cover sizes.")
+    parser.add_argument("--payloads", type=int, nargs="+", default=PAYLOAD_SIZES, help="Payload lengths in bytes.")
+    parser.add_argument("--wavelet", default="haar")
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--work-directory", default=os.path.join(main.ROOT_DIRECTORY, "benchmarks", ".work"))
+    parser.add_argument("--output", help="Write results as JSON to this file (default: stdout).")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against.")
+    parser.add_argument("--save-baseline", help="Write results as the new baseline.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed median slowdown (0.25 = 25%%).")
+    parser.add_argument("--memory", action="store_true", help="Also record traced-allocation peak and RSS delta.")
+    parser.add_argument("--memory-budget", type=parse_budget, nargs="+", default=[],
+                        help="stage=MiB pairs; a stage whose traced peak exceeds its budget fails the run.")
+    args = parser.parse_args(argv)
+    args.memory = args.memory or bool(args.memory_budget)
+    return args
+
+
+def main_cli(argv=None):
+    args = parse_args(argv)
+    results = run(args)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    over_memory = over_budget(results, dict(args.memory_budget)) if args.memory else []
+
+    report = {
+        "results": results,
+        "regressions": [result_key(result) for result in regressions],
+        "over_memory_budget": [result_key(result) for result in over_memory],
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=4)
+
+    for result in regressions:
+        print(f"REGRESSION {result_key(result)}: {result['ratio']:.2f}x baseline median", file=sys.stderr)
+
+    for result in over_memory:
+        print(f"OVER MEMORY BUDGET {result_key(result)}: {result['traced_peak'] / 2 ** 20:.2f} MiB", file=sys.stderr)
+
+    return 1 if regressions or over_memory else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,98 @@
+import numpy as np
+
+
+class BitBuffer:
+    __slots__ = ("data", "length")
+
+    def __init__(self, data=b'', length=None):
+        if isinstance(data, np.ndarray):
+            self.data = data.astype(np.uint8, copy=False).reshape(-1)
+        else:
+            self.data = np.frombuffer(data, dtype=np.uint8)
+
+        capacity = self.data.size * 8
+        self.length = capacity if length is None else length
+        if not 0 <= self.length <= capacity:
+            raise ValueError(f"Bit length {self.length} does not fit in {self.data.size} bytes.")
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(data)
+
+    @classmethod
+    def from_bits(cls, bits):
+        bits = np.asarray(bits, dtype=np.uint8).reshape(-1)
+        return cls(np.packbits(bits), bits.size)
+
+    @classmethod
+    def from_string(cls, text):
+        return cls.from_bits(np.frombuffer(text.encode('ascii'), dtype=np.uint8) - 48)
+
+    @classmethod
+    def zeros(cls, length):
+        return cls(np.zeros(-(-length // 8), dtype=np.uint8), length)
+
+    @property
+    def nbytes(self):
+        return -(-self.length // 8)
+
+    def unpack(self):
+        return np.unpackbits(self.data[:self.nbytes], count=self.length)
+
+    def packed(self):
+        packed = self.data[:self.nbytes]
+        tail = self.length % 8
+        if tail and packed[-1] & (0xFF >> tail):
+            packed = packed.copy()
+            packed[-1] &= (0xFF << (8 - tail)) & 0xFF
+        return packed
+
+    def to_bytes(self):
+        return self.packed().tobytes()
+
+    def to_string(self):
+        return (self.unpack() + 48).tobytes().decode('ascii')
+
+    def plane(self, shape):
+        size = int(np.prod(shape))
+        plane = np.zeros(size, dtype=np.uint8)
+
+        bits = self[:size].unpack()
+        plane[:bits.size] = bits
+        return plane.reshape(shape)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            stop = max(start, stop)
+
+            if step != 1:
+                return BitBuffer.from_bits(self.unpack()[key])
+
+            first = start // 8
+            view = BitBuffer(self.data[first:-(-stop // 8)], stop - first * 8)
+            if start % 8 == 0:
+                return view
+            return BitBuffer.from_bits(view.unpack()[start % 8:])
+
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("Bit index out of range.")
+        return int(self.data[key // 8] >> (7 - key % 8)) & 1
+
+    def __add__(self, other):
+        if self.length % 8 == 0:
+            return BitBuffer(np.concatenate([self.data[:self.nbytes], other.packed()]), self.length + other.length)
+        return BitBuffer.from_bits(np.concatenate([self.unpack(), other.unpack()]))
+
+    def __eq__(self, other):
+        if not isinstance(other, BitBuffer):
+            return NotImplemented
+        return self.length == other.length and np.array_equal(self.packed(), other.packed())
+
+    def __repr__(self):
+        return f"BitBuffer(length={self.length})"
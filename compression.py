@@ -0,0 +1,98 @@
+import lzma
+import zlib
+
+import numpy as np
+
+from huffman import CanonicalHuffman
+
+CODEC_IDS = {
+    "none": 0,
+    "huffman": 1,
+    "zlib": 2,
+    "lzma": 3,
+}
+CODEC_NAMES = {codec_id: codec for codec, codec_id in CODEC_IDS.items()}
+
+MIN_COMPRESS_SIZE = 64
+LZMA_MIN_SIZE = 4096
+ENTROPY_LIMIT = 7.5
+SAMPLE_SIZE = 64 * 1024
+SAMPLE_BLOCKS = 4
+LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 6}]
+
+
+class Compression:
+    @staticmethod
+    def entropy(data):
+        if not data:
+            return 0.0
+
+        counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+        probabilities = counts[counts > 0] / len(data)
+        return float(-np.sum(probabilities * np.log2(probabilities)))
+
+    @staticmethod
+    def candidates(data):
+        if len(data) < MIN_COMPRESS_SIZE or Compression.entropy(data) >= ENTROPY_LIMIT:
+            return []
+
+        codecs = ["huffman", "zlib"]
+        if len(data) >= LZMA_MIN_SIZE:
+            codecs.append("lzma")
+        return codecs
+
+    @staticmethod
+    def compress(data, codec=None):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        if codec is not None:
+            return codec, Compression._compress(codec, data)
+
+        candidates = Compression.candidates(data)
+        if len(data) > SAMPLE_SIZE and len(candidates) > 1:
+            sample = Compression.sample(data)
+            candidates = [min(candidates, key=lambda candidate: len(Compression._compress(candidate, sample)))]
+
+        best_codec, best = "none", data
+        for candidate in candidates:
+            compressed = Compression._compress(candidate, data)
+            if len(compressed) < len(best):
+                best_codec, best = candidate, compressed
+
+        return best_codec, best
+
+    @staticmethod
+    def sample(data, size=SAMPLE_SIZE, blocks=SAMPLE_BLOCKS):
+        if len(data) <= size:
+            return data
+
+        block = size // blocks
+        stride = (len(data) - block) // (blocks - 1)
+        return b''.join(data[start:start + block] for start in range(0, stride * blocks, stride))
+
+    @staticmethod
+    def decompress(codec, data):
+        if codec == "none":
+            return bytes(data)
+        if codec == "huffman":
+            return CanonicalHuffman.decode(bytes(data))
+        if codec == "zlib":
+            return zlib.decompress(data, wbits=-15)
+        if codec == "lzma":
+            return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+
+        raise ValueError(f"Invalid codec: {codec}")
+
+    @staticmethod
+    def _compress(codec, data):
+        if codec == "none":
+            return data
+        if codec == "huffman":
+            return CanonicalHuffman.encode(data)
+        if codec == "zlib":
+            return zlib.compress(data, 9, wbits=-15)
+        if codec == "lzma":
+            return lzma.compress(data, format=lzma.FORMAT_RAW, filters=LZMA_FILTERS)
+
+        raise ValueError(f"Invalid codec: {codec}")
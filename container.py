@@ -0,0 +1,75 @@
+import struct
+
+from compression import CODEC_IDS, CODEC_NAMES
+
+CONTAINER_MAGIC = b'SG'
+CONTAINER_VERSION = 1
+CONTAINER_HEADER = struct.Struct('>2sBBBHI')
+
+METHOD_IDS = {
+    "rsa": 1,
+    "aes": 2,
+    "hybrid": 3,
+    "hybrid_batch": 4,
+}
+METHOD_NAMES = {method_id: method for method, method_id in METHOD_IDS.items()}
+
+
+class Container:
+    def __init__(self, method, body, key=b'', codec="none"):
+        if method not in METHOD_IDS:
+            raise ValueError(f"Invalid cypher method: {method}")
+        if codec not in CODEC_IDS:
+            raise ValueError(f"Invalid codec: {codec}")
+
+        self.method = method
+        self.body = bytes(body)
+        self.key = bytes(key)
+        self.codec = codec
+
+    def pack(self):
+        header = CONTAINER_HEADER.pack(
+            CONTAINER_MAGIC, CONTAINER_VERSION, METHOD_IDS[self.method], CODEC_IDS[self.codec],
+            len(self.key), len(self.body),
+        )
+        return header + self.key + self.body
+
+    @staticmethod
+    def total_size(header):
+        _, _, _, _, key_size, body_size = Container._parse_header(header)
+        return CONTAINER_HEADER.size + key_size + body_size
+
+    @classmethod
+    def unpack(cls, data):
+        _, _, method_id, codec_id, key_size, body_size = cls._parse_header(data)
+
+        end = CONTAINER_HEADER.size + key_size + body_size
+        if len(data) < end:
+            raise ValueError(f"Truncated container: expected {end} bytes, got {len(data)}.")
+
+        key = data[CONTAINER_HEADER.size:CONTAINER_HEADER.size + key_size]
+        body = data[CONTAINER_HEADER.size + key_size:end]
+        return cls(METHOD_NAMES[method_id], body, key, CODEC_NAMES[codec_id])
+
+    @classmethod
+    def read(cls, read_bytes):
+        header = read_bytes(CONTAINER_HEADER.size)
+        return cls.unpack(read_bytes(cls.total_size(header)))
+
+    @staticmethod
+    def _parse_header(data):
+        if len(data) < CONTAINER_HEADER.size:
+            raise ValueError("Truncated container header.")
+
+        fields = CONTAINER_HEADER.unpack_from(data)
+        magic, version, method_id, codec_id = fields[:4]
+        if magic != CONTAINER_MAGIC:
+            raise ValueError("No payload container found.")
+        if version != CONTAINER_VERSION:
+            raise ValueError(f"Unsupported container version: {version}")
+        if method_id not in METHOD_NAMES:
+            raise ValueError(f"Unknown method id: {method_id}")
+        if codec_id not in CODEC_NAMES:
+            raise ValueError(f"Unknown codec id: {codec_id}")
+
+        return fields
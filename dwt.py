@@ -1,25 +1,33 @@
-import pywt
 import numpy as np
 from PIL import Image, PngImagePlugin
 import os
 
+from parallel import thread_map
+from wavelets import get_backend
+
 
 class DWT:
-    def __init__(self, wavelet='haar', quantization_step=25):
+    def __init__(self, wavelet='haar', quantization_step=25, threads=None):
         self.wavelet = wavelet
         self.q_step = quantization_step
+        self.threads = threads
+        self.backend = get_backend(wavelet)
+
+    def compress_image(self, image, message_image=None, output_path=None, level=1, save=True, mode='RGB'):
+        if mode not in ('RGB', 'YCbCr'):
+            raise ValueError(f"Unsupported output mode: {mode}")
 
-    def compress_image(self, image_path, message_image_path=None, output_path=None, level=1):
-        img = Image.open(image_path).convert('YCbCr')
+        img = self._open(image).convert('YCbCr')
         y, cb, cr = [np.array(c) for c in img.split()]
 
         message_bits = None
-        if message_image_path:
-            message_img = Image.open(message_image_path).convert('L')
+        if isinstance(message_image, np.ndarray):
+            message_bits = message_image
+        elif message_image is not None:
+            message_img = self._open(message_image).convert('L')
             message_bits = np.array(message_img) // 255
 
-        cb_comp = self._process_channel(cb, level, message_bits)
-        cr_comp = self._process_channel(cr, level, message_bits)
+        cb_comp, cr_comp = self._process_channels(np.stack([cb, cr]), level, message_bits)
 
         final_img_ycbcr = Image.merge('YCbCr', (
             Image.fromarray(y.astype(np.uint8)),
@@ -29,60 +37,87 @@ class DWT:
 
         final_img_rgb = final_img_ycbcr.convert('RGB')
 
-        if output_path is None:
-            base, ext = os.path.splitext(image_path)
-            output_path = base + '_compressed_embedded.png'
+        if save:
+            if output_path is None:
+                base, ext = os.path.splitext(image)
+                output_path = base + '_compressed_embedded.png'
 
-        pnginfo = PngImagePlugin.PngInfo()
+            pnginfo = PngImagePlugin.PngInfo()
 
-        final_img_rgb.save(output_path, format='PNG', optimize=True, pnginfo=pnginfo)
-        print(f"Compressed stego image saved at: {output_path}")
+            final_img_rgb.save(output_path, format='PNG', optimize=True, pnginfo=pnginfo)
+            print(f"Compressed stego image saved at: {output_path}")
 
+        if mode == 'YCbCr':
+            return final_img_ycbcr
         return final_img_rgb
 
-    def _process_channel(self, channel, level, message_bits=None):
-        coeffs = pywt.wavedec2(channel, self.wavelet, level=level)
-        cA, *details = coeffs
+    @staticmethod
+    def _open(image):
+        if isinstance(image, Image.Image):
+            return image
+        return Image.open(image)
+
+    def _process_channels(self, channels, level, message_bits=None, row_offset=0):
+        if level < 1:
+            raise ValueError("DWT level must be at least 1.")
+
+        if self.threads and self.threads > 1 and channels.ndim >= 3 and channels.shape[-3] > 1:
+            parts = np.split(channels, channels.shape[-3], axis=-3)
+            processed = thread_map(lambda part: self._transform_channels(part, level, message_bits, row_offset),
+                                   parts, self.threads)
+            return np.concatenate(processed, axis=-3)
+
+        return self._transform_channels(channels, level, message_bits, row_offset)
 
-        target_level = -1
-        cH, cV, cD = details[target_level]
+    def _transform_channels(self, channels, level, message_bits=None, row_offset=0):
+        height, width = channels.shape[-2:]
+        coeffs = self.backend.analysis(channels, level)
+        bands = self.backend.detail_bands(coeffs)
 
-        def quantize(band):
-            return np.round(band / self.q_step) * self.q_step
+        if all(band.shape == bands[0].shape for band in bands):
+            bands = list(self._process_bands(np.stack(bands), message_bits, row_offset))
+        else:
+            bands = [self._process_bands(band, message_bits, row_offset) for band in bands]
 
-        cH = quantize(cH)
-        cV = quantize(cV)
-        cD = quantize(cD)
+        self.backend.set_detail_bands(coeffs, bands)
+
+        rec_channels = self.backend.synthesis(coeffs)
+        rec_channels = np.clip(rec_channels[..., :height, :width], 0, 255)
+
+        return rec_channels.astype(np.uint8)
+
+    def _process_bands(self, bands, message_bits=None, row_offset=0):
+        bands = np.round(bands / self.q_step) * self.q_step
 
         if message_bits is not None:
-            def embed_lsb(band):
-                flat_band = band.flatten()
-                msg_resized = np.resize(message_bits, flat_band.shape)
-                band_int = flat_band.astype(np.int32)
-                band_emb = (band_int & ~1) | msg_resized.flatten()
-                return band_emb.reshape(band.shape)
+            message_tile = self._message_tile(message_bits, bands.shape[-2:], row_offset)
+            bands = (bands.astype(np.int32) & ~1) | message_tile
 
-            cH = embed_lsb(cH)
-            cV = embed_lsb(cV)
-            cD = embed_lsb(cD)
+        return bands
 
-        details[target_level] = (cH, cV, cD)
+    @staticmethod
+    def _message_tile(message_bits, shape, row_offset=0):
+        if message_bits.ndim == 3:
+            flat_bits = message_bits.reshape(message_bits.shape[0], -1)
+            start = row_offset * shape[-1]
+            positions = np.arange(start, start + shape[0] * shape[1]) % flat_bits.shape[1]
+            return flat_bits[:, positions].reshape(-1, 1, *shape)
 
-        coeffs_processed = [cA] + details
-        rec_channel = pywt.waverec2(coeffs_processed, self.wavelet)
-        rec_channel = np.clip(rec_channel, 0, 255)
+        if not row_offset:
+            return np.resize(message_bits, shape)
 
-        return rec_channel.astype(np.uint8)
+        flat_bits = np.ravel(message_bits)
+        start = row_offset * shape[-1]
+        positions = np.arange(start, start + shape[0] * shape[1]) % flat_bits.size
+        return flat_bits[positions].reshape(shape)
 
     def extract_message_image(self, image_path, level=1):
-        img = Image.open(image_path).convert('YCbCr')
+        img = self._open(image_path).convert('YCbCr')
         _, cb, cr = [np.array(c) for c in img.split()]
 
         def extract_from_channel(channel):
-            coeffs = pywt.wavedec2(channel, self.wavelet, level=level)
-            cA, *details = coeffs
-            target_level = -1
-            cH, cV, cD = details[target_level]
+            coeffs = self.backend.analysis(channel, level)
+            cH, cV, cD = self.backend.detail_bands(coeffs)
 
             def extract_lsb(band):
                 band_int = band.astype(np.int32)
@@ -94,9 +129,10 @@ class DWT:
 
             combined_bits = np.concatenate([bits_cH, bits_cV, bits_cD])
             total_required = 128 * 128
-            combined_bits = combined_bits[:total_required]
+            combined_bits = np.pad(combined_bits[:total_required], (0, max(0, total_required - combined_bits.size)))
 
             message_image = combined_bits.reshape((128, 128)) * 255
             return Image.fromarray(message_image.astype(np.uint8), mode='L')
 
         return extract_from_channel(cb)
+
@@ -0,0 +1,73 @@
+import argparse
+import os
+
+from PIL import Image
+
+from aes import AESHandler
+from compression import Compression
+from container import Container
+from hybrid import SessionKeyCache, SESSION_ID_SIZE
+from key_manager import KeyManager
+from lsb import LSB
+from rsa import RSAHandler
+from tracing import span
+
+ROOT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+RSA_PRIVATE_KEY = f"{ROOT_DIRECTORY}/keys/rsa/private.key"
+AES_KEY = f"{ROOT_DIRECTORY}/keys/aes/private.key"
+
+KEYS = KeyManager()
+SESSION_KEYS = SessionKeyCache()
+
+
+def decrypt_container(container, rsa_private_key=RSA_PRIVATE_KEY, aes_key=AES_KEY):
+    if container.method == "aes":
+        with span("key_load"):
+            key = KEYS.aes_key(aes_key)
+        with span("cipher"):
+            return b''.join(AESHandler.decrypt_stream(container.body, key))
+
+    if container.method not in ("rsa", "hybrid", "hybrid_batch"):
+        raise ValueError(f"Invalid cypher method: {container.method}")
+
+    with span("key_load"):
+        private_key = KEYS.rsa_cipher(rsa_private_key)
+
+    with span("cipher"):
+        if container.method == "rsa":
+            return RSAHandler.decrypt(container.body, private_key)
+
+        if container.method == "hybrid":
+            session_key = RSAHandler.decrypt(container.key, private_key)
+            return b''.join(AESHandler.decrypt_stream(container.body, session_key))
+
+        session_id, wrapped_key = container.key[:SESSION_ID_SIZE], container.key[SESSION_ID_SIZE:]
+        return SESSION_KEYS.decrypt(session_id, wrapped_key, container.body, private_key)
+
+
+def extract_message(image, rsa_private_key=RSA_PRIVATE_KEY, aes_key=AES_KEY):
+    if not isinstance(image, Image.Image):
+        with Image.open(image) as opened:
+            return extract_message(opened, rsa_private_key, aes_key)
+
+    container = Container.read(LSB(image).read_bytes)
+    message = decrypt_container(container, rsa_private_key, aes_key)
+
+    return Compression.decompress(container.codec, message).decode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract and decrypt messages from stego images.")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--rsa-private-key", default=RSA_PRIVATE_KEY)
+    parser.add_argument("--aes-key", default=AES_KEY)
+    args = parser.parse_args()
+
+    for image_path in args.images:
+        message = extract_message(image_path, args.rsa_private_key, args.aes_key)
+        print(message if len(args.images) == 1 else f"{image_path}: {message}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,12 @@
 import heapq
+import math
+import struct
 from collections import Counter, namedtuple
 
+import numpy as np
+
+from bits import BitBuffer
+
 
 class HuffmanNode(namedtuple("Node", ["char", "freq", "left", "right"])):
     def __lt__(self, other):
@@ -37,6 +43,9 @@ class Huffman:
             self.build_codes(node.right, prefix + "1")
 
     def encode(self, data):
+        return self.encode_bits(data).to_string()
+
+    def encode_bits(self, data):
         if isinstance(data, bytes):
             data = list(data)
         elif isinstance(data, str):
@@ -48,14 +57,29 @@ class Huffman:
         self.build_tree(data)
         self.build_codes(self.tree)
 
-        encoded_text = ''.join(self.codes[char] for char in data)
-        return encoded_text
+        symbols = list(self.codes)
+        lengths = np.array([len(self.codes[symbol]) for symbol in symbols], dtype=np.int64)
+        max_length = int(lengths.max(initial=0)) or 1
+
+        patterns = np.zeros((len(symbols), max_length), dtype=np.uint8)
+        for row, symbol in enumerate(symbols):
+            code = self.codes[symbol]
+            patterns[row, :len(code)] = np.frombuffer(code.encode('ascii'), dtype=np.uint8) - 48
+        masks = np.arange(max_length) < lengths[:, None]
+
+        index = {symbol: row for row, symbol in enumerate(symbols)}
+        rows = np.fromiter((index[char] for char in data), dtype=np.int64, count=len(data))
+
+        return BitBuffer.from_bits(patterns[rows][masks[rows]])
 
     def decode(self, encoded_text):
+        return self.decode_bits(BitBuffer.from_string(encoded_text))
+
+    def decode_bits(self, bits):
         result = []
         node = self.tree
-        for bit in encoded_text:
-            node = node.left if bit == "0" else node.right
+        for bit in bits.unpack().tolist():
+            node = node.right if bit else node.left
             if node.char is not None:
                 result.append(node.char)
                 node = self.tree
@@ -64,3 +88,279 @@ class Huffman:
             return bytes(result)
         else:
             return ''.join(result)
+
+    @staticmethod
+    def encode_packed(data):
+        is_text = isinstance(data, str)
+        if is_text:
+            data = data.encode('utf-8')
+
+        huffman = Huffman()
+        data_bits = huffman.encode_bits(data)
+
+        if huffman.tree is not None and huffman.tree.char is not None:
+            data_bits = BitBuffer.zeros(len(data))
+
+        symbols, shape = [], []
+        Huffman._serialize_tree(huffman.tree, symbols, shape)
+
+        header = struct.pack('>BH', int(is_text), len(symbols)) + bytes(symbols)
+        padding = -len(data_bits) % 8
+
+        return (
+            header
+            + BitBuffer.from_bits(shape).to_bytes()
+            + bytes([padding])
+            + data_bits.to_bytes()
+        )
+
+    @staticmethod
+    def decode_packed(payload):
+        is_text, symbol_count = struct.unpack_from('>BH', payload)
+        offset = struct.calcsize('>BH')
+
+        symbols = list(payload[offset:offset + symbol_count])
+        offset += symbol_count
+
+        shape_length = max(2 * symbol_count - 1, 0)
+        shape_bytes = -(-shape_length // 8)
+        shape = BitBuffer(np.frombuffer(payload, dtype=np.uint8, count=shape_bytes, offset=offset), shape_length)
+        offset += shape_bytes
+
+        padding = payload[offset]
+        data = np.frombuffer(payload, dtype=np.uint8, offset=offset + 1)
+        data_bits = BitBuffer(data, max(data.size * 8 - padding, 0))
+
+        decoder = Huffman()
+        decoder.tree = Huffman._deserialize_tree(iter(shape.unpack().tolist()), iter(symbols))
+
+        if decoder.tree is None or len(data_bits) == 0:
+            result = b''
+        else:
+            if decoder.tree.char is not None:
+                decoder.tree = HuffmanNode(None, 0, decoder.tree, decoder.tree)
+            result = decoder.decode_bits(data_bits)
+
+        return result.decode('utf-8') if is_text else result
+
+    @staticmethod
+    def _serialize_tree(node, symbols, shape):
+        if node is None:
+            return
+
+        if node.char is not None:
+            shape.append(1)
+            symbols.append(node.char)
+        else:
+            shape.append(0)
+            Huffman._serialize_tree(node.left, symbols, shape)
+            Huffman._serialize_tree(node.right, symbols, shape)
+
+    @staticmethod
+    def _deserialize_tree(shape, symbols):
+        bit = next(shape, None)
+        if bit is None:
+            return None
+
+        if bit:
+            return HuffmanNode(next(symbols), 0, None, None)
+
+        left = Huffman._deserialize_tree(shape, symbols)
+        right = Huffman._deserialize_tree(shape, symbols)
+        return HuffmanNode(None, 0, left, right)
+
+
+class CanonicalHuffman:
+    MAX_CODE_LENGTH = 16
+    BLOCK_BITS = 1 << 20
+    MIN_SEGMENT = 256
+    MAX_SEGMENT = 4095
+    BITMAP_FLAG = 2
+    BITMAP_THRESHOLD = 48
+
+    @staticmethod
+    def code_lengths(data, max_length=MAX_CODE_LENGTH):
+        counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+        frequency = {symbol: int(count) for symbol, count in enumerate(counts) if count}
+
+        while True:
+            lengths = CanonicalHuffman._tree_lengths(frequency)
+            if not lengths or max(lengths.values()) <= max_length:
+                return lengths
+            frequency = {symbol: (freq + 1) >> 1 for symbol, freq in frequency.items()}
+
+    @staticmethod
+    def _tree_lengths(frequency):
+        if len(frequency) == 1:
+            return {symbol: 1 for symbol in frequency}
+
+        lengths = dict.fromkeys(frequency, 0)
+        heap = [(freq, symbol, [symbol]) for symbol, freq in frequency.items()]
+        heapq.heapify(heap)
+
+        while len(heap) > 1:
+            left_freq, left_order, left = heapq.heappop(heap)
+            right_freq, _, right = heapq.heappop(heap)
+            for symbol in left + right:
+                lengths[symbol] += 1
+            heapq.heappush(heap, (left_freq + right_freq, left_order, left + right))
+
+        return lengths
+
+    @staticmethod
+    def assign_codes(lengths):
+        codes = {}
+        code = 0
+        previous_length = 0
+
+        for symbol, length in sorted(lengths.items(), key=lambda item: (item[1], item[0])):
+            code <<= length - previous_length
+            codes[symbol] = code
+            code += 1
+            previous_length = length
+
+        return codes
+
+    @staticmethod
+    def encode(data):
+        is_text = isinstance(data, str)
+        if is_text:
+            data = data.encode('utf-8')
+
+        symbols = np.frombuffer(data, dtype=np.uint8)
+        lengths = CanonicalHuffman.code_lengths(data)
+        codes = CanonicalHuffman.assign_codes(lengths)
+
+        ordered = sorted(lengths)
+        header = CanonicalHuffman._pack_table(is_text, ordered, lengths)
+
+        length_table = np.zeros(256, dtype=np.int64)
+        code_table = np.zeros(256, dtype=np.int64)
+        for symbol in ordered:
+            length_table[symbol] = lengths[symbol]
+            code_table[symbol] = codes[symbol]
+
+        max_length = int(length_table.max()) if ordered else 1
+        positions = np.arange(max_length)
+        patterns = ((code_table[:, None] >> np.maximum(length_table[:, None] - 1 - positions, 0)) & 1).astype(np.uint8)
+        masks = positions < length_table[:, None]
+
+        symbol_ends = np.cumsum(length_table[symbols])
+        segment = CanonicalHuffman.segment_size(symbols.size)
+        sync_points = symbol_ends[segment - 1:-1:segment]
+        segment_bits = np.diff(sync_points, prepend=0).astype('>u2')
+
+        body = bytearray()
+        pending = np.empty(0, dtype=np.uint8)
+
+        chunk = max(1, CanonicalHuffman.BLOCK_BITS // max_length)
+        for start in range(0, symbols.size, chunk):
+            block = symbols[start:start + chunk]
+            bits = patterns[block][masks[block]]
+            if pending.size:
+                bits = np.concatenate([pending, bits])
+            usable = bits.size - bits.size % 8
+            body += np.packbits(bits[:usable]).tobytes()
+            pending = bits[usable:]
+
+        if pending.size:
+            body += np.packbits(pending).tobytes()
+
+        return header + struct.pack('>I', symbols.size) + segment_bits.tobytes() + bytes(body)
+
+    @staticmethod
+    def decode(payload):
+        is_text, lengths, offset = CanonicalHuffman._unpack_table(payload)
+
+        count, = struct.unpack_from('>I', payload, offset)
+        offset += 4
+
+        segment = CanonicalHuffman.segment_size(count)
+        segments = -(-count // segment)
+        segment_bits = np.frombuffer(payload, dtype='>u2', count=max(segments - 1, 0), offset=offset)
+        offset += segment_bits.nbytes
+
+        data = np.frombuffer(payload, dtype=np.uint8, offset=offset)
+
+        result = b''
+        if count:
+            result = CanonicalHuffman._decode_segments(data, count, lengths, np.cumsum(segment_bits, dtype=np.int64))
+        return result.decode('utf-8') if is_text else result
+
+    @staticmethod
+    def segment_size(count):
+        return min(max(CanonicalHuffman.MIN_SEGMENT, 2 * math.isqrt(count)), CanonicalHuffman.MAX_SEGMENT)
+
+    @staticmethod
+    def _pack_table(is_text, ordered, lengths):
+        nibbles = np.array([lengths[symbol] - 1 for symbol in ordered], dtype=np.uint8)
+        nibbles = np.pad(nibbles, (0, nibbles.size % 2))
+        packed_lengths = ((nibbles[0::2] << 4) | nibbles[1::2]).tobytes()
+
+        if len(ordered) > CanonicalHuffman.BITMAP_THRESHOLD:
+            presence = np.zeros(256, dtype=np.uint8)
+            presence[ordered] = 1
+            flags = int(is_text) | CanonicalHuffman.BITMAP_FLAG
+            return bytes([flags]) + np.packbits(presence).tobytes() + packed_lengths
+
+        return struct.pack('>BB', int(is_text), len(ordered)) + bytes(ordered) + packed_lengths
+
+    @staticmethod
+    def _unpack_table(payload):
+        flags = payload[0]
+        is_text = bool(flags & 1)
+
+        if flags & CanonicalHuffman.BITMAP_FLAG:
+            presence = np.unpackbits(np.frombuffer(payload, dtype=np.uint8, count=32, offset=1))
+            ordered = np.flatnonzero(presence).tolist()
+            offset = 33
+        else:
+            count = payload[1]
+            ordered = list(payload[2:2 + count])
+            offset = 2 + count
+
+        packed_lengths = np.frombuffer(payload, dtype=np.uint8, count=-(-len(ordered) // 2), offset=offset)
+        nibbles = np.stack([packed_lengths >> 4, packed_lengths & 15], axis=1).reshape(-1)
+        lengths = {symbol: int(length) + 1 for symbol, length in zip(ordered, nibbles)}
+
+        return is_text, lengths, offset + packed_lengths.size
+
+    @staticmethod
+    def _decode_segments(data, count, lengths, sync_points):
+        codes = CanonicalHuffman.assign_codes(lengths)
+        max_length = max(lengths.values())
+
+        symbol_table = np.zeros(1 << max_length, dtype=np.uint8)
+        length_table = np.zeros(1 << max_length, dtype=np.int64)
+        for symbol, code in codes.items():
+            shift = max_length - lengths[symbol]
+            symbol_table[code << shift:(code + 1) << shift] = symbol
+            length_table[code << shift:(code + 1) << shift] = lengths[symbol]
+
+        padded = np.concatenate([data, np.zeros(3, dtype=np.uint8)]).astype(np.int64)
+        words = (padded[:-2] << 16) | (padded[1:-1] << 8) | padded[2:]
+        mask = (1 << max_length) - 1
+
+        segment = CanonicalHuffman.segment_size(count)
+        positions = np.concatenate([[0], sync_points])
+        first_symbols = np.arange(positions.size) * segment
+        decoded = np.empty((positions.size, segment), dtype=np.uint8)
+        invalid = np.zeros(positions.size, dtype=bool)
+        last_step = count - first_symbols[-1] - 1
+        end = 0
+
+        for step in range(min(segment, count)):
+            byte_index = np.minimum(positions >> 3, words.size - 1)
+            windows = (words[byte_index] >> (24 - max_length - (positions & 7))) & mask
+            decoded[:, step] = symbol_table[windows]
+            step_lengths = length_table[windows]
+            invalid |= (step_lengths == 0) & (first_symbols + step < count)
+            positions += step_lengths
+            if step == last_step:
+                end = positions[-1]
+
+        total_bits = data.size * 8
+        if invalid.any() or not np.array_equal(positions[:-1], sync_points) or not total_bits - 8 < end <= total_bits:
+            raise ValueError("Invalid canonical Huffman stream.")
+
+        return decoded.reshape(-1)[:count].tobytes()
@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+from Crypto.Random import get_random_bytes
+
+from aes import AESHandler
+from rsa import RSAHandler
+
+SESSION_ID_SIZE = 8
+
+
+class HybridSession:
+    def __init__(self, max_messages=1000, max_age=300.0, key_size=32):
+        self.max_messages = max_messages
+        self.max_age = max_age
+        self.key_size = key_size
+        self.wraps = 0
+        self._session = None
+        self._lock = threading.Lock()
+
+    def encrypt(self, message, public_key):
+        session_id, aes_key, wrapped_key = self._acquire(public_key)
+        ciphertext = b''.join(AESHandler.encrypt_stream(message, aes_key))
+        return session_id, wrapped_key, ciphertext
+
+    def rotate(self):
+        with self._lock:
+            self._session = None
+
+    def _acquire(self, public_key):
+        with self._lock:
+            session = self._session
+            if session is None or self._expired(session):
+                aes_key = get_random_bytes(self.key_size)
+                wrapped_key = RSAHandler.encrypt(aes_key, public_key)
+                session = {
+                    "id": get_random_bytes(SESSION_ID_SIZE),
+                    "key": aes_key,
+                    "wrapped": wrapped_key,
+                    "created": time.monotonic(),
+                    "messages": 0,
+                }
+                self._session = session
+                self.wraps += 1
+
+            session["messages"] += 1
+            return session["id"], session["key"], session["wrapped"]
+
+    def _expired(self, session):
+        if self.max_messages is not None and session["messages"] >= self.max_messages:
+            return True
+        return self.max_age is not None and time.monotonic() - session["created"] >= self.max_age
+
+
+class SessionKeyCache:
+    def __init__(self, capacity=128):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def unwrap(self, session_id, wrapped_key, private_key):
+        with self._lock:
+            entry = self._keys.get(session_id)
+            if entry is not None and entry[0] == wrapped_key:
+                self._keys.move_to_end(session_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        aes_key = RSAHandler.decrypt(wrapped_key, private_key)
+
+        with self._lock:
+            self._keys[session_id] = (wrapped_key, aes_key)
+            self._keys.move_to_end(session_id)
+            while len(self._keys) > self.capacity:
+                self._keys.popitem(last=False)
+
+        return aes_key
+
+    def decrypt(self, session_id, wrapped_key, ciphertext, private_key):
+        aes_key = self.unwrap(session_id, wrapped_key, private_key)
+        return b''.join(AESHandler.decrypt_stream(ciphertext, aes_key))
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "sessions": len(self._keys)}
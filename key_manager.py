@@ -0,0 +1,64 @@
+import os
+import threading
+
+from Crypto.Cipher import PKCS1_OAEP
+
+from aes import AESHandler
+from rsa import RSAHandler
+
+
+class KeyManager:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def rsa_key(self, key_path):
+        return self._get('rsa', key_path)[0]
+
+    def rsa_cipher(self, key_path):
+        return self._get('rsa', key_path)[1]
+
+    def aes_key(self, key_path):
+        return self._get('aes', key_path)[0]
+
+    def invalidate(self, key_path=None):
+        with self._lock:
+            if key_path is None:
+                self._entries.clear()
+                return
+
+            key_path = os.path.abspath(key_path)
+            for key_id in [key_id for key_id in self._entries if key_id[1] == key_path]:
+                del self._entries[key_id]
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "keys": len(self._entries)}
+
+    def _get(self, kind, key_path):
+        key_id = (kind, os.path.abspath(key_path))
+        mtime = os.stat(key_path).st_mtime_ns
+
+        with self._lock:
+            entry = self._entries.get(key_id)
+            if entry is not None and entry[0] == mtime:
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            value = self._load(kind, key_path)
+            self._entries[key_id] = (mtime, value)
+            return value
+
+    @staticmethod
+    def _load(kind, key_path):
+        if kind == 'rsa':
+            key = RSAHandler.load_key(key_path)
+            return key, PKCS1_OAEP.new(key)
+
+        if kind == 'aes':
+            return AESHandler.load_key(key_path), None
+
+        raise ValueError(f"Invalid key kind: {kind}")
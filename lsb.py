@@ -1,6 +1,11 @@
 import numpy as np
 from PIL import Image
 
+from bits import BitBuffer
+
+CHUNK_PIXELS = 32768
+
+
 class LSB:
     def __init__(self, image, message=None):
         self.image = image
@@ -8,43 +13,87 @@ class LSB:
 
     def apply(self):
         img_array = np.array(self.image)
-        h, w, _ = img_array.shape
-
-        binary_message = ''.join(format(ord(char), '08b') for char in self.message + '\0')
-        total_bits = len(binary_message)
-
-        idx = 0
-        for i in range(h):
-            for j in range(w):
-                for k in range(3):
-                    if idx >= total_bits:
-                        break
-                    img_array[i, j, k] = (img_array[i, j, k] & 254) | int(binary_message[idx])
-                    idx += 1
-                if idx >= total_bits:
-                    break
-            if idx >= total_bits:
-                break
+        binary_message = LSB.message_bits(self.message)
+
+        if isinstance(self.message, (bytes, bytearray)) and len(binary_message) > LSB.capacity(self.image):
+            raise ValueError(f"Payload of {len(self.message)} bytes does not fit in a {self.image.size} image.")
+
+        LSB.embed_bits(img_array, binary_message)
 
         return Image.fromarray(img_array)
 
+    @staticmethod
+    def capacity(image):
+        w, h = image.size
+        return w * h * 3
+
+    @staticmethod
+    def message_bits(message):
+        if isinstance(message, BitBuffer):
+            return message
+        if isinstance(message, (bytes, bytearray)):
+            return BitBuffer.from_bytes(message)
+
+        return BitBuffer.from_bytes((message + '\0').encode('latin-1'))
+
+    @staticmethod
+    def embed_bits(img_array, binary_message, bit_offset=0):
+        pixels = img_array.reshape(-1, img_array.shape[-1])
+
+        binary_message = binary_message[bit_offset:bit_offset + pixels.shape[0] * 3].unpack()
+        total_bits = binary_message.size
+        if not total_bits:
+            return img_array
+
+        used_pixels = -(-total_bits // 3)
+        channels = pixels[:used_pixels, :3].reshape(-1)
+        channels[:total_bits] = (channels[:total_bits] & 254) | binary_message
+        pixels[:used_pixels, :3] = channels.reshape(used_pixels, 3)
+
+        return img_array
+
     def extract(self):
-        img_array = np.array(self.image)
-        h, w, _ = img_array.shape
+        message = bytearray()
+        pending = np.empty(0, dtype=np.uint8)
+
+        for bits in self._iter_bits():
+            if pending.size:
+                bits = np.concatenate([pending, bits])
+
+            usable = bits.size - bits.size % 8
+            data = np.packbits(bits[:usable])
+
+            terminator = np.flatnonzero(data == 0)
+            if terminator.size:
+                message += data[:terminator[0]].tobytes()
+                return message.decode('latin-1')
+
+            message += data.tobytes()
+            pending = bits[usable:]
+
+        if pending.size:
+            value = int(pending.astype(np.int64) @ (1 << np.arange(pending.size)[::-1]))
+            if value:
+                message.append(value)
+
+        return message.decode('latin-1')
+
+    def read_bytes(self, count):
+        total_bits = count * 8
+        if total_bits > LSB.capacity(self.image):
+            raise ValueError(f"Cannot read {count} bytes from a {self.image.size} image.")
 
-        bits = []
-        for i in range(h):
-            for j in range(w):
-                for k in range(3):
-                    bits.append(str(img_array[i, j, k] & 1))
+        w, _ = self.image.size
+        rows = -(-total_bits // (w * 3))
+        strip = np.asarray(self.image.crop((0, 0, w, rows)))
+        bits = (strip[..., :3] & 1).reshape(-1)[:total_bits]
 
-        bytes_list = [''.join(bits[i:i + 8]) for i in range(0, len(bits), 8)]
+        return BitBuffer.from_bits(bits).to_bytes()
 
-        message = ""
-        for byte in bytes_list:
-            char = chr(int(byte, 2))
-            if char == '\0':
-                break
-            message += char
+    def _iter_bits(self):
+        w, h = self.image.size
+        rows = max(1, CHUNK_PIXELS // w)
 
-        return message
+        for top in range(0, h, rows):
+            strip = np.asarray(self.image.crop((0, top, w, min(top + rows, h))))
+            yield (strip[..., :3] & 1).reshape(-1)
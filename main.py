@@ -1,242 +1,306 @@
+import argparse
 import os
 
-from huffman import Huffman
-from metrics.ct import CT
-from metrics.cr import CR
-from metrics.sp import SP
-from metrics.cs import CS
-from metrics.mse import MSE
-from metrics.bpp import BPP
-from metrics.ssim import SSIM
-from metrics.psnr import PSNR
+from compression import Compression
+from container import Container
+import metrics
 from rsa import RSAHandler
 from aes import AESHandler
-from dwt import DWT
 from lsb import LSB
+from extract import KEYS, decrypt_container
+from hybrid import HybridSession
+from tracing import TRACER, span
+from profiling import PROFILER, memory_stage
 from PIL import Image
+from bits import BitBuffer
 from Crypto.Random import get_random_bytes
 
-import base64
-import json
 
 ROOT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
 
 RSA = RSAHandler(f"{ROOT_DIRECTORY}/keys/rsa", 2048)
 AES = AESHandler(f"{ROOT_DIRECTORY}/keys/aes", 32)
-HUFFMAN = Huffman()
-DWT = DWT()
+DWT = None
+METRICS_ENGINE = None
+THREADS = None
+HYBRID_SESSION = HybridSession()
+
+RSA_PUBLIC_KEY = f"{ROOT_DIRECTORY}/keys/rsa/public.key"
+RSA_PRIVATE_KEY = f"{ROOT_DIRECTORY}/keys/rsa/private.key"
+AES_KEY = f"{ROOT_DIRECTORY}/keys/aes/private.key"
 
 METRICS_FILE = f"{ROOT_DIRECTORY}/metrics-results.json"
+METRICS_DB = f"{ROOT_DIRECTORY}/metrics-results.db"
+STORE = None
 
+IMAGES = ["lena.png", "apple.png", "bear.png", "man.png", "woman.png"]
+METHODS = ["rsa", "aes", "hybrid"]
+MESSAGE = "Saudacoes Cordiais Vitinho"
+MESSAGE_PLANE = (128, 128)
 
-def save_metrics(image, method, cr, ct, cs, sp, mse, ssim, bbp, psnr):
-    new_metrics = {
-        "image": image,
-        "method": method,
-        "cr": cr,
-        "ct": ct,
-        "cs": cs,
-        "sp": sp,
-        "mse": mse,
-        "ssim": ssim,
-        "bbp": bbp,
-        "psnr": psnr
-    }
 
-    if os.path.exists(METRICS_FILE):
-        with open(METRICS_FILE, "r") as f:
-            data = json.load(f)
-    else:
-        data = []
+def dwt_processor():
+    global DWT
 
-    data.append(new_metrics)
+    if DWT is None:
+        from dwt import DWT as DWTProcessor
+        DWT = DWTProcessor(threads=THREADS)
 
-    with open(METRICS_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    return DWT
 
 
-def message_embedding_rsa(message):
-    public_key = RSA.load_key(f"{ROOT_DIRECTORY}/keys/rsa/public.key")
+def metrics_engine():
+    global METRICS_ENGINE
 
-    encrypted_message = RSA.encrypt(message, public_key)
-    encoded_message = HUFFMAN.encode(encrypted_message)
+    if METRICS_ENGINE is None:
+        METRICS_ENGINE = metrics.MetricsEngine(threads=THREADS)
 
-    return base64.b64encode(encoded_message.encode()).decode()
+    return METRICS_ENGINE
 
 
-def message_embedding_aes(message):
-    private_key = AES.load_key(f"{ROOT_DIRECTORY}/keys/aes/private.key")
+def metrics_store():
+    global STORE
 
-    encrypted_message = AES.encrypt(message, private_key)
-    encoded_message = HUFFMAN.encode(encrypted_message)
+    if STORE is None:
+        migrate = not os.path.exists(METRICS_DB) and os.path.exists(METRICS_FILE)
+        STORE = metrics.MetricsStore(METRICS_DB)
+        if migrate:
+            STORE.import_json(METRICS_FILE)
 
-    return base64.b64encode(encoded_message.encode()).decode()
+    return STORE
 
 
-def message_embedding_hybrid(message):
-    aes_key = get_random_bytes(32)
+def save_metrics(image, method, cr, ct, cs, sp, mse, ssim, bbp, psnr, key=None, **extra):
+    metrics_store().append({
+        "image": image,
+        "method": method,
+        "cr": cr,
+        "ct": ct,
+        "cs": cs,
+        "sp": sp,
+        "mse": mse,
+        "ssim": ssim,
+        "bbp": bbp,
+        "psnr": psnr,
+        **extra
+    }, key=key)
 
-    encrypted_message = AESHandler.encrypt(message, aes_key)
 
-    public_key = RSA.load_key(f"{ROOT_DIRECTORY}/keys/rsa/public.key")
-    encrypted_aes_key = RSA.encrypt(aes_key, public_key)
+def export_metrics():
+    metrics_store().export_json(METRICS_FILE)
 
-    encoded_message = HUFFMAN.encode(encrypted_message)
 
-    combined = (
-            base64.b64encode(encrypted_aes_key).decode('utf-8')
-            + "|" +
-            base64.b64encode(encoded_message.encode()).decode('utf-8')
-    )
+def compress_message(message):
+    with span("compress"):
+        return Compression.compress(message)
 
-    return combined
 
+def decompress_message(container, data):
+    with span("decompress"):
+        return Compression.decompress(container.codec, data).decode('utf-8')
 
-def message_extracting_hybrid(message):
-    encrypted_key_b64, encoded_message_b64 = message.split("|")
 
-    encrypted_key = base64.b64decode(encrypted_key_b64)
+def message_embedding_rsa(message):
+    codec, message = compress_message(message)
 
-    private_key = RSA.load_key(f"{ROOT_DIRECTORY}/keys/rsa/private.key")
-    aes_key = RSA.decrypt(encrypted_key, private_key)
+    with span("key_load"):
+        public_key = KEYS.rsa_cipher(RSA_PUBLIC_KEY)
 
-    decoded_message = base64.b64decode(encoded_message_b64).decode('utf-8')
-    decrypted_compressed = HUFFMAN.decode(decoded_message)
+    with span("cipher"):
+        encrypted_message = RSA.encrypt(message, public_key)
 
-    return AESHandler.decrypt(decrypted_compressed, aes_key)
+    with span("container"):
+        return Container("rsa", encrypted_message, codec=codec).pack()
 
 
-def message_extracting_aes(message):
-    base64_decoded = base64.b64decode(message.encode()).decode('utf-8')
-    decoded_message = HUFFMAN.decode(base64_decoded)
+def message_embedding_aes(message):
+    codec, message = compress_message(message)
 
-    key = AES.load_key(f"{ROOT_DIRECTORY}/keys/aes/private.key")
+    with span("key_load"):
+        private_key = KEYS.aes_key(AES_KEY)
 
-    return AES.decrypt(decoded_message, key)
+    with span("cipher"):
+        encrypted_message = b''.join(AESHandler.encrypt_stream(message, private_key))
 
+    with span("container"):
+        return Container("aes", encrypted_message, codec=codec).pack()
 
-def message_extracting_rsa(message):
-    base64_decoded = base64.b64decode(message.encode()).decode('utf-8')
-    decoded_message = HUFFMAN.decode(base64_decoded)
 
-    private_key = RSA.load_key(f"{ROOT_DIRECTORY}/keys/rsa/private.key")
+def message_embedding_hybrid(message):
+    codec, message = compress_message(message)
 
-    return RSA.decrypt(decoded_message, private_key).decode('utf-8')
+    with span("cipher"):
+        aes_key = get_random_bytes(32)
 
+        encrypted_message = b''.join(AESHandler.encrypt_stream(message, aes_key))
 
-def image_embedding(image_path, binary_image_path, output_path):
-    compressed_image = DWT.compress_image(image_path, binary_image_path, output_path)
-    return compressed_image
+    with span("key_load"):
+        public_key = KEYS.rsa_cipher(RSA_PUBLIC_KEY)
+    with span("cipher"):
+        encrypted_aes_key = RSA.encrypt(aes_key, public_key)
 
+    with span("container"):
+        return Container("hybrid", encrypted_message, encrypted_aes_key, codec).pack()
 
-def paper_embedding_process(message, image_path, embedded_image_path, binary_image_path, compressed_image_path, method):
-    ct = CT()
-    cr = CR()
-    cs = CS()
-    sp = SP()
-    mse = MSE()
-    bpp = BPP()
-    psnr = PSNR()
-    ssim = SSIM()
 
-    ct.start()
+def message_embedding_hybrid_batch(message):
+    codec, message = compress_message(message)
 
-    if method == "rsa":
-        compressed_encrypted_message = message_embedding_rsa(message)
-    elif method == "aes":
-        compressed_encrypted_message = message_embedding_aes(message)
-    elif method == "hybrid":
-        compressed_encrypted_message = message_embedding_hybrid(message)
-    else:
-        raise ValueError(f"Invalid cypher method: {method}")
+    with span("key_load"):
+        public_key = KEYS.rsa_cipher(RSA_PUBLIC_KEY)
 
-    message_bytes = base64.b64decode(compressed_encrypted_message)
-    binary_message = ''.join(format(byte, '08b') for byte in message_bytes)
-    bin_to_image(binary_message, binary_image_path)
+    with span("cipher"):
+        session_id, encrypted_aes_key, encrypted_message = HYBRID_SESSION.encrypt(message, public_key)
 
-    compressed_image = image_embedding(image_path, binary_image_path, compressed_image_path)
+    with span("container"):
+        return Container("hybrid_batch", encrypted_message, session_id + encrypted_aes_key, codec).pack()
 
-    lsb = LSB(compressed_image, compressed_encrypted_message)
-    embedded_image = lsb.apply()
 
-    compressed_time = ct.stop()
+def message_extracting(container):
+    decrypted_message = decrypt_container(container, RSA_PRIVATE_KEY, AES_KEY)
+    return decompress_message(container, decrypted_message)
 
-    embedded_image.save(embedded_image_path, optimize=True)
 
-    mse_value = mse.calculate(image_path, embedded_image_path)
+def image_embedding(image, binary_image, output_path, save=True):
+    compressed_image = dwt_processor().compress_image(image, binary_image, output_path, save=save)
+    return compressed_image
 
-    save_metrics(
+
+def paper_embedding_process(message, image_path, embedded_image_path, binary_image_path, compressed_image_path, method,
+                            metrics_writer=save_metrics, artifacts=False):
+    mark = TRACER.mark()
+    memory_mark = PROFILER.mark()
+    ct = metrics.CT()
+
+    with span("embed", image=os.path.basename(image_path), method=method):
+        ct.start()
+
+        with memory_stage("cipher"):
+            if method == "rsa":
+                payload = message_embedding_rsa(message)
+            elif method == "aes":
+                payload = message_embedding_aes(message)
+            elif method == "hybrid":
+                payload = message_embedding_hybrid(message)
+            elif method == "hybrid_batch":
+                payload = message_embedding_hybrid_batch(message)
+            else:
+                raise ValueError(f"Invalid cypher method: {method}")
+
+        with span("bin_to_image"), memory_stage("bin_to_image"):
+            message_plane = BitBuffer.from_bytes(payload).plane(MESSAGE_PLANE)
+            if artifacts:
+                bin_to_image(message_plane, binary_image_path)
+
+        with span("dwt"), memory_stage("dwt"):
+            compressed_image = image_embedding(image_path, message_plane, compressed_image_path, save=artifacts)
+
+        with span("lsb"), memory_stage("lsb"):
+            lsb = LSB(compressed_image, payload)
+            embedded_image = lsb.apply()
+
+        compressed_time = ct.stop()
+
+        with span("png_save"), memory_stage("png_save"):
+            embedded_image.save(embedded_image_path, optimize=True)
+
+        with span("metrics"), memory_stage("metrics"):
+            results = metrics_engine().calculate(
+                metrics.ImageContext(image_path),
+                metrics.ImageContext(embedded_image_path, embedded_image),
+                compressed_time,
+            )
+
+    if TRACER.enabled:
+        results["spans"] = TRACER.totals(mark)
+    if PROFILER.enabled:
+        results["memory"] = PROFILER.stages(memory_mark)
+
+    metrics_writer(
         image=os.path.basename(image_path),
         method=method,
-        cr=cr.calculate(image_path, embedded_image_path),
         ct=compressed_time,
-        cs=cs.calculate(embedded_image_path, compressed_time),
-        sp=sp.calculate(image_path, embedded_image_path),
-        mse=mse_value,
-        ssim=ssim.calculate(image_path, embedded_image_path),
-        bbp=bpp.calculate(embedded_image_path),
-        psnr=psnr.calculate(mse_value),
+        **results,
     )
 
     return embedded_image
 
 
 def paper_extract_process(image, method):
-    lsb = LSB(image)
-    lsb_extracted_message = lsb.extract()
-
-    if method == "rsa":
-        return message_extracting_rsa(lsb_extracted_message)
-    elif method == "aes":
-        return message_extracting_aes(lsb_extracted_message)
-    elif method == "hybrid":
-        return message_extracting_hybrid(lsb_extracted_message)
-    else:
-        raise ValueError(f"Invalid cypher method: {method}")
+    with span("extract", method=method):
+        with span("lsb"), memory_stage("lsb_extract"):
+            lsb = LSB(image)
+            container = Container.read(lsb.read_bytes)
 
+        if container.method != method:
+            raise ValueError(f"Payload was embedded with {container.method}, not {method}.")
 
-def bin_to_image(binary_string, output_path):
-    width, height = (128, 128)
-    total_pixels = width * height
+        return message_extracting(container)
 
-    binary_string = binary_string.ljust(total_pixels, '0')[:total_pixels]
 
-    image = Image.new("1", (width, height))
+def bin_to_image(bits, output_path=None):
+    if isinstance(bits, str):
+        bits = BitBuffer.from_string(bits)
+    if isinstance(bits, BitBuffer):
+        bits = bits.plane(MESSAGE_PLANE)
 
-    pixels = [int(bit) for bit in binary_string]
-    image.putdata(pixels)
+    image = Image.fromarray(bits.astype(bool))
 
-    image.save(output_path)
+    if output_path is not None:
+        image.save(output_path)
 
     return image
 
 
-def main():
-    images = ["lena.png", "apple.png", "bear.png", "man.png", "woman.png"]
-    methods = ["rsa", "aes", "hybrid"]
-    message = "Saudacoes Cordiais Vitinho"
+def image_paths(image_name, method):
+    image_path = os.path.join(ROOT_DIRECTORY, "images", image_name)
+
+    base_name = os.path.splitext(image_name)[0]
+    base_name_lsb = f"{base_name}_{method}_lsb.png"
+    base_name_binary = f"{base_name}_{method}_binary.png"
+    base_name_compressed = f"{base_name}_{method}_compressed.png"
+    embedded_image_path = os.path.join(ROOT_DIRECTORY, "images", base_name_lsb)
+    binary_image_path = os.path.join(ROOT_DIRECTORY, "images", base_name_binary)
+    compressed_image_path = os.path.join(ROOT_DIRECTORY, "images", base_name_compressed)
+
+    return image_path, embedded_image_path, binary_image_path, compressed_image_path
+
+
+def set_threads(threads):
+    global DWT, METRICS_ENGINE, THREADS
+
+    THREADS = threads
+    if DWT is not None:
+        DWT.threads = threads
+    if METRICS_ENGINE is not None:
+        METRICS_ENGINE.threads = threads
+
+
+def main(artifacts=False, trace_path=None, profile_memory=False, threads=None):
+    set_threads(threads)
+    if trace_path is not None:
+        TRACER.enable()
+    if profile_memory:
+        PROFILER.enable()
+
+    images = IMAGES
+    methods = METHODS
+    message = MESSAGE
 
     for method in methods:
         print(f"\n{'-' * 50}")
         print(f"\nCypher method: {method.upper()}")
         for image_name in images:
-            image_path = os.path.join(ROOT_DIRECTORY, "images", image_name)
-
-            base_name_lsb = image_name.replace(".png", f"_{method}_lsb.png")
-            base_name_binary = image_name.replace(".png", f"_{method}_binary.png")
-            base_name_compressed = image_name.replace(".png", f"_{method}_compressed.png")
-            embedded_image_path = os.path.join(ROOT_DIRECTORY, "images", base_name_lsb)
-            binary_image_path = os.path.join(ROOT_DIRECTORY, "images", base_name_binary)
-            compressed_image_path = os.path.join(ROOT_DIRECTORY, "images", base_name_compressed)
+            image_path, embedded_image_path, binary_image_path, compressed_image_path = image_paths(image_name, method)
 
             print(f"\nProcessing image [{image_name}] with {method.upper()} cypher method")
 
             paper_embedding_process(message, image_path, embedded_image_path, binary_image_path, compressed_image_path,
-                                    method)
+                                    method, artifacts=artifacts)
 
             image_to_extract = Image.open(embedded_image_path)
 
-            extracted_image = DWT.extract_message_image(embedded_image_path)
+            extracted_image = dwt_processor().extract_message_image(embedded_image_path)
             extracted_image.show()
 
             extracted_message = paper_extract_process(image_to_extract, method)
@@ -246,6 +310,23 @@ def main():
 
             print(f"Message extracted: {extracted_message}")
 
+    export_metrics()
+
+    if trace_path is not None:
+        TRACER.export_chrome(trace_path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Embed and extract the sample message in every image x method pair.")
+    parser.add_argument("--artifacts", action="store_true", help="Also write the binary and DWT intermediate images.")
+    parser.add_argument("--trace", help="Record stage spans and write them as Chrome trace-event JSON to this file.")
+    parser.add_argument("--memory", action="store_true",
+                        help="Record per-stage traced-allocation peaks and RSS deltas with each metrics record.")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Threads for the Cb/Cr DWT and metrics (default: serial).")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(args.artifacts, args.trace, args.memory, args.threads)
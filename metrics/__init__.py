@@ -0,0 +1,31 @@
+import importlib
+
+_EXPORTS = {
+    "BPP": "bpp",
+    "CR": "cr",
+    "CS": "cs",
+    "CT": "ct",
+    "MSE": "mse",
+    "PSNR": "psnr",
+    "SP": "sp",
+    "SSIM": "ssim",
+    "METRICS": "engine",
+    "ImageContext": "engine",
+    "MetricsEngine": "engine",
+    "MetricsStore": "store",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,174 @@
+import math
+import os
+
+import numpy as np
+from PIL import Image
+
+from parallel import thread_map
+from tracing import span
+
+METRICS = ("cr", "cs", "sp", "mse", "ssim", "bbp", "psnr")
+
+SSIM_WINDOW = 7
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+
+
+class ImageContext:
+    def __init__(self, path, image=None):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Image path must exist: {path}")
+
+        self.path = path
+        self.file_size = os.path.getsize(path)
+        self.image = image if image is not None else Image.open(path)
+        self.width, self.height = self.image.size
+        self._planes = {}
+
+    def load(self):
+        self.image.load()
+        return self
+
+    def plane(self, mode, size=None):
+        key = (mode, size)
+        if key not in self._planes:
+            image = self.image.convert(mode)
+            if size is not None and image.size != size:
+                image = image.resize(size)
+            self._planes[key] = np.asarray(image)
+        return self._planes[key]
+
+
+class MetricsEngine:
+    def __init__(self, metrics=None, threads=None):
+        self.metrics = tuple(metrics) if metrics is not None else METRICS
+        self.threads = threads
+
+        unknown = set(self.metrics) - set(METRICS)
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(sorted(unknown))}")
+
+    def calculate(self, original, embedded, compression_time=None):
+        if not isinstance(original, ImageContext):
+            original = ImageContext(original)
+        if not isinstance(embedded, ImageContext):
+            embedded = ImageContext(embedded)
+
+        results = {}
+
+        if "cr" in self.metrics:
+            with span("metric.cr"):
+                if original.file_size == 0:
+                    raise ValueError("Original image size is zero, cannot calculate compression rate.")
+                results["cr"] = original.file_size / embedded.file_size
+
+        if "cs" in self.metrics:
+            with span("metric.cs"):
+                if compression_time is None or compression_time <= 0:
+                    raise ValueError("Compression time must be greater than zero.")
+                results["cs"] = embedded.file_size / compression_time
+
+        if "sp" in self.metrics:
+            with span("metric.sp"):
+                if original.file_size == 0:
+                    raise ValueError("Original file size is zero, cannot calculate saving percentage.")
+                results["sp"] = (original.file_size - embedded.file_size) / original.file_size * 100
+
+        tasks = []
+        if "mse" in self.metrics or "psnr" in self.metrics:
+            tasks.append(self._mse_metrics)
+        if "ssim" in self.metrics:
+            tasks.append(self._ssim_metrics)
+
+        if self.threads and self.threads > 1 and len(tasks) > 1:
+            original.load()
+            embedded.load()
+
+        for task_results in thread_map(lambda task: task(original, embedded), tasks, self.threads):
+            results.update(task_results)
+
+        if "bbp" in self.metrics:
+            with span("metric.bbp"):
+                total_pixels = embedded.width * embedded.height
+                if total_pixels == 0:
+                    raise ValueError("Image has no pixels (width or height is zero).")
+                results["bbp"] = embedded.file_size * 8 / total_pixels
+
+        return results
+
+    def _mse_metrics(self, original, embedded):
+        results = {}
+
+        with span("metric.mse"):
+            mse = self.mse(original, embedded)
+        if "mse" in self.metrics:
+            results["mse"] = mse
+        if "psnr" in self.metrics:
+            with span("metric.psnr"):
+                results["psnr"] = self.psnr(mse)
+
+        return results
+
+    def _ssim_metrics(self, original, embedded):
+        with span("metric.ssim"):
+            return {"ssim": self.ssim(original.plane("L"), embedded.plane("L"))}
+
+    @staticmethod
+    def mse(original, embedded):
+        original_array = original.plane("YCbCr")
+        embedded_array = embedded.plane("YCbCr", (original.width, original.height))
+
+        difference = original_array.astype(np.int64) - embedded_array
+        return float(np.mean(difference * difference))
+
+    @staticmethod
+    def psnr(mse, max_pixel_value=255):
+        if mse <= 0:
+            raise ValueError("MSE must be greater than 0 to calculate PSNR.")
+        return 10 * math.log10(max_pixel_value ** 2 / mse)
+
+    @staticmethod
+    def ssim(image1, image2, data_range=255):
+        return float(np.mean(MetricsEngine._ssim_map(image1, image2, data_range)))
+
+    @staticmethod
+    def ssim_stack(images1, images2, data_range=255):
+        return np.mean(MetricsEngine._ssim_map(images1, images2, data_range), axis=(-2, -1))
+
+    @staticmethod
+    def _ssim_map(image1, image2, data_range):
+        if image1.shape != image2.shape:
+            raise ValueError("Images must have the same dimensions for SSIM.")
+
+        x = image1.astype(np.int64)
+        y = image2.astype(np.int64)
+        samples = SSIM_WINDOW ** 2
+
+        mean_x = MetricsEngine._window_sums(x) / samples
+        mean_y = MetricsEngine._window_sums(y) / samples
+        mean_xx = MetricsEngine._window_sums(x * x) / samples
+        mean_yy = MetricsEngine._window_sums(y * y) / samples
+        mean_xy = MetricsEngine._window_sums(x * y) / samples
+
+        covariance_norm = samples / (samples - 1)
+        variance_x = covariance_norm * (mean_xx - mean_x * mean_x)
+        variance_y = covariance_norm * (mean_yy - mean_y * mean_y)
+        covariance_xy = covariance_norm * (mean_xy - mean_x * mean_y)
+
+        c1 = (SSIM_K1 * data_range) ** 2
+        c2 = (SSIM_K2 * data_range) ** 2
+
+        numerator = (2 * mean_x * mean_y + c1) * (2 * covariance_xy + c2)
+        denominator = (mean_x * mean_x + mean_y * mean_y + c1) * (variance_x + variance_y + c2)
+
+        return numerator / denominator
+
+    @staticmethod
+    def _window_sums(values):
+        integral = np.zeros(values.shape[:-2] + (values.shape[-2] + 1, values.shape[-1] + 1), dtype=np.int64)
+        np.cumsum(np.cumsum(values, axis=-2), axis=-1, out=integral[..., 1:, 1:])
+
+        w = SSIM_WINDOW
+        return (
+            integral[..., w:, w:] - integral[..., :-w, w:] - integral[..., w:, :-w] + integral[..., :-w, :-w]
+        ).astype(np.float64)
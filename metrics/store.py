@@ -0,0 +1,203 @@
+import argparse
+import json
+import math
+import sqlite3
+import threading
+import time
+import uuid
+
+from atomic import atomic_write
+
+METRIC_FIELDS = ("cr", "ct", "cs", "sp", "mse", "ssim", "bbp", "psnr")
+RECORD_FIELDS = ("image", "method") + METRIC_FIELDS
+PERCENTILES = {"p50": 0.50, "p95": 0.95}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    created REAL NOT NULL,
+    image TEXT NOT NULL,
+    method TEXT NOT NULL,
+    {", ".join(f"{field} REAL" for field in METRIC_FIELDS)},
+    extra TEXT,
+    job_key TEXT
+);
+CREATE INDEX IF NOT EXISTS metrics_image ON metrics (image);
+CREATE INDEX IF NOT EXISTS metrics_method ON metrics (method);
+CREATE INDEX IF NOT EXISTS metrics_run ON metrics (run_id);
+"""
+KEY_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS metrics_job_key ON metrics (job_key)"
+
+
+class MetricsStore:
+    def __init__(self, path, run_id=None, timeout=30.0):
+        self.path = path
+        self.run_id = run_id or uuid.uuid4().hex
+        self.timeout = timeout
+        self._local = threading.local()
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(metrics)")]
+        if "job_key" not in columns:
+            connection.execute("ALTER TABLE metrics ADD COLUMN job_key TEXT")
+        connection.execute(KEY_INDEX)
+        connection.commit()
+
+    def append(self, record, run_id=None, key=None):
+        connection = self._connection()
+        with connection:
+            cursor = self._insert(connection, record, run_id or self.run_id, key)
+        return cursor.lastrowid
+
+    def records(self, run_id=None, image=None, method=None):
+        where, parameters = self._filters(run_id, image, method)
+        cursor = self._connection().execute(
+            f"SELECT {', '.join(RECORD_FIELDS)}, extra, job_key FROM metrics {where} ORDER BY id",
+            parameters,
+        )
+
+        for row in cursor:
+            record = dict(zip(RECORD_FIELDS, row))
+            if row[-2]:
+                record.update(json.loads(row[-2]))
+            if row[-1]:
+                record["key"] = row[-1]
+            yield record
+
+    def aggregate(self, fields=METRIC_FIELDS, run_id=None, image=None):
+        where, parameters = self._filters(run_id, image, None)
+        connection = self._connection()
+
+        methods = [
+            row[0] for row in connection.execute(
+                f"SELECT DISTINCT method FROM metrics {where} ORDER BY method", parameters
+            )
+        ]
+
+        summary = {}
+        for method in methods:
+            method_where, method_parameters = self._filters(run_id, image, method)
+            count, = connection.execute(f"SELECT COUNT(*) FROM metrics {method_where}", method_parameters).fetchone()
+            summary[method] = {"count": count}
+
+            for field in fields:
+                if field not in METRIC_FIELDS:
+                    raise ValueError(f"Unknown metric field: {field}")
+                summary[method][field] = self._field_stats(connection, field, method_where, method_parameters)
+
+        return summary
+
+    def export_json(self, path, run_id=None, image=None, method=None):
+        written = False
+        with atomic_write(path) as f:
+            f.write("[")
+            for record in self.records(run_id, image, method):
+                body = json.dumps(record, indent=4).replace("\n", "\n    ")
+                f.write(("," if written else "") + "\n    " + body)
+                written = True
+            f.write("\n]" if written else "]")
+
+    def import_json(self, path, run_id="imported"):
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        connection = self._connection()
+        with connection:
+            for record in data:
+                record = dict(record)
+                self._insert(connection, record, run_id, record.pop("key", None))
+
+        return len(data)
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    @staticmethod
+    def _insert(connection, record, run_id, key=None):
+        extra = {name: value for name, value in record.items() if name not in RECORD_FIELDS}
+        columns = ("run_id", "created") + RECORD_FIELDS + ("extra", "job_key")
+        values = (
+            (run_id, time.time())
+            + tuple(record.get(field) for field in RECORD_FIELDS)
+            + (json.dumps(extra) if extra else None, key)
+        )
+
+        updates = ", ".join(f"{column} = excluded.{column}" for column in RECORD_FIELDS + ("extra",))
+        return connection.execute(
+            f"INSERT INTO metrics ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT (job_key) DO UPDATE SET {updates}",
+            values,
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _filters(run_id, image, method):
+        clauses, parameters = [], []
+        for column, value in (("run_id", run_id), ("image", image), ("method", method)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                parameters.append(value)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, parameters
+
+    @staticmethod
+    def _field_stats(connection, field, where, parameters):
+        not_null = f"{where} AND {field} IS NOT NULL" if where else f"WHERE {field} IS NOT NULL"
+        count, mean, minimum, maximum = connection.execute(
+            f"SELECT COUNT({field}), AVG({field}), MIN({field}), MAX({field}) FROM metrics {not_null}",
+            parameters,
+        ).fetchone()
+
+        stats = {"mean": mean, "min": minimum, "max": maximum}
+        for name, quantile in PERCENTILES.items():
+            stats[name] = None
+            if count:
+                rank = quantile * (count - 1)
+                lower = math.floor(rank)
+                values = [
+                    row[0] for row in connection.execute(
+                        f"SELECT {field} FROM metrics {not_null} ORDER BY {field} LIMIT 2 OFFSET ?",
+                        parameters + [lower],
+                    )
+                ]
+                upper_value = values[1] if len(values) > 1 else values[0]
+                stats[name] = values[0] + (upper_value - values[0]) * (rank - lower)
+
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or export a metrics store.")
+    parser.add_argument("database")
+    parser.add_argument("command", choices=["summary", "export", "import"])
+    parser.add_argument("--run-id")
+    parser.add_argument("--image")
+    parser.add_argument("--json", help="JSON file to export to or import from.")
+    args = parser.parse_args()
+
+    store = MetricsStore(args.database)
+
+    if args.command == "summary":
+        print(json.dumps(store.aggregate(run_id=args.run_id, image=args.image), indent=4))
+    elif args.command == "export":
+        store.export_json(args.json, run_id=args.run_id, image=args.image)
+    else:
+        print(f"Imported {store.import_json(args.json)} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_POOLS = {}
+_LOCK = threading.Lock()
+
+
+def thread_pool(threads):
+    with _LOCK:
+        pool = _POOLS.get(threads)
+        if pool is None:
+            pool = _POOLS[threads] = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="stego")
+        return pool
+
+
+def thread_map(function, items, threads=None):
+    items = list(items)
+
+    if not threads or threads <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+
+    return list(thread_pool(threads).map(function, items))
@@ -0,0 +1,117 @@
+import os
+import threading
+import tracemalloc
+
+from tracing import NULL_SPAN
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss():
+    # getrusage only reports the peak RSS, so without statm there is no current figure to report.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return None
+
+
+class MemoryStage:
+    __slots__ = ("profiler", "name", "start_traced", "start_rss", "max_traced")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit(self)
+        return False
+
+
+class MemoryProfiler:
+    def __init__(self, enabled=False):
+        self.enabled = False
+        self._records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracing = False
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def stage(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return MemoryStage(self, name)
+
+    def mark(self):
+        return len(self._records)
+
+    def records(self, since=0):
+        with self._lock:
+            return self._records[since:]
+
+    def stages(self, since=0):
+        stages = {}
+        for name, traced_peak, rss_delta in self.records(since):
+            stage = stages.setdefault(name, {"traced_peak": 0, "rss_delta": 0})
+            stage["traced_peak"] = max(stage["traced_peak"], traced_peak)
+            if stage["rss_delta"] is not None:
+                stage["rss_delta"] = None if rss_delta is None else stage["rss_delta"] + rss_delta
+        return stages
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, stage):
+        stack = self._stack()
+        current, peak = tracemalloc.get_traced_memory()
+
+        if stack:
+            stack[-1].max_traced = max(stack[-1].max_traced, peak)
+
+        tracemalloc.reset_peak()
+        stage.start_traced = current
+        stage.max_traced = current
+        stage.start_rss = current_rss()
+        stack.append(stage)
+
+    def _exit(self, stage):
+        stack = self._stack()
+        stack.pop()
+
+        _, peak = tracemalloc.get_traced_memory()
+        traced_peak = max(stage.max_traced, peak) - stage.start_traced
+        end_rss = current_rss()
+        rss_delta = None if end_rss is None or stage.start_rss is None else end_rss - stage.start_rss
+
+        if stack:
+            stack[-1].max_traced = max(stack[-1].max_traced, stage.max_traced, peak)
+
+        with self._lock:
+            self._records.append((stage.name, traced_peak, rss_delta))
+
+
+PROFILER = MemoryProfiler()
+
+
+def memory_stage(name):
+    return PROFILER.stage(name)
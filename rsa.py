@@ -1,6 +1,7 @@
 import os
 from Crypto.PublicKey import RSA
 from Crypto.Cipher import PKCS1_OAEP
+from Crypto.Cipher.PKCS1_OAEP import PKCS1OAEP_Cipher
 
 
 class RSAHandler:
@@ -32,7 +33,7 @@ class RSAHandler:
 
     @staticmethod
     def encrypt(data, public_key):
-        cipher = PKCS1_OAEP.new(public_key)
+        cipher = RSAHandler._cipher(public_key)
 
         if isinstance(data, str):
             data = data.encode('utf-8')
@@ -41,6 +42,12 @@ class RSAHandler:
 
     @staticmethod
     def decrypt(encrypted_data, private_key):
-        cipher = PKCS1_OAEP.new(private_key)
+        cipher = RSAHandler._cipher(private_key)
 
         return cipher.decrypt(encrypted_data)
+
+    @staticmethod
+    def _cipher(key):
+        if isinstance(key, PKCS1OAEP_Cipher):
+            return key
+        return PKCS1_OAEP.new(key)
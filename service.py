@@ -0,0 +1,370 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+import batch
+import main
+from atomic import FILE_MODE
+from metrics.engine import ImageContext, MetricsEngine, METRICS
+
+HOST = "127.0.0.1"
+PORT = 8765
+QUEUE_SIZE = 64
+LATENCY_WINDOW = 1000
+MAX_BODY_SIZE = 1 << 20
+IMAGE_DIRECTORY = os.path.join(main.ROOT_DIRECTORY, "images")
+OUTPUT_DIRECTORY = os.path.join(main.ROOT_DIRECTORY, "results", "service")
+INPUT_DIRECTORIES = (IMAGE_DIRECTORY, OUTPUT_DIRECTORY)
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    415: "Unsupported Media Type",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def resolve_path(path, roots):
+    # Relative names resolve under the first root; symlinks and ".." must still land inside one of the roots.
+    resolved = os.path.realpath(os.path.join(roots[0], path))
+
+    for root in roots:
+        root = os.path.realpath(root)
+        if os.path.commonpath((root, resolved)) == root:
+            return resolved
+
+    raise ValueError(f"Path is outside the allowed directories: {path}")
+
+
+def embed_job(request):
+    method = request["method"]
+    image_path = resolve_path(request["image"], (IMAGE_DIRECTORY,))
+    if not image_path.lower().endswith(".png"):
+        raise ValueError(f"Cover must be a PNG image: {request['image']}")
+
+    output_path = request.get("output")
+    if output_path is not None:
+        output_path = resolve_path(output_path, (OUTPUT_DIRECTORY,))
+        if not output_path.lower().endswith(".png"):
+            raise ValueError(f"Output must be a PNG path: {request['output']}")
+
+    directory = os.path.dirname(output_path) if output_path else OUTPUT_DIRECTORY
+    os.makedirs(directory, exist_ok=True)
+
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    descriptor, embedded_image_path = tempfile.mkstemp(dir=directory, prefix=f"{stem}_{method}_", suffix=".png")
+    os.close(descriptor)
+    base = os.path.splitext(embedded_image_path)[0]
+    records = []
+
+    try:
+        main.paper_embedding_process(
+            request["message"],
+            image_path,
+            embedded_image_path,
+            f"{base}_binary.png",
+            f"{base}_compressed.png",
+            method,
+            metrics_writer=lambda **record: records.append(record),
+            artifacts=request.get("artifacts", False),
+        )
+        os.chmod(embedded_image_path, FILE_MODE)
+        if output_path:
+            os.replace(embedded_image_path, output_path)
+            embedded_image_path = output_path
+    except BaseException:
+        if os.path.exists(embedded_image_path):
+            os.unlink(embedded_image_path)
+        raise
+
+    return records[0], embedded_image_path
+
+
+def extract_job(request):
+    with Image.open(resolve_path(request["image"], INPUT_DIRECTORIES)) as image:
+        return main.paper_extract_process(image, request["method"])
+
+
+def metrics_job(request):
+    compression_time = request.get("compression_time")
+    metrics = METRICS if compression_time else [metric for metric in METRICS if metric != "cs"]
+
+    return MetricsEngine(metrics, threads=main.THREADS).calculate(
+        ImageContext(resolve_path(request["original"], INPUT_DIRECTORIES)),
+        ImageContext(resolve_path(request["embedded"], INPUT_DIRECTORIES)),
+        compression_time,
+    )
+
+
+class ServiceStats:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.started = time.time()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self._latencies = {}
+        self._window = window
+
+    def record(self, endpoint, latency, ok=True):
+        self._latencies.setdefault(endpoint, deque(maxlen=self._window)).append(latency)
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    def summary(self, queue):
+        latencies = {}
+        for endpoint, samples in self._latencies.items():
+            ordered = sorted(samples)
+            latencies[endpoint] = {
+                "count": len(ordered),
+                "mean": sum(ordered) / len(ordered),
+                "p50": ordered[(len(ordered) - 1) // 2],
+                "p95": ordered[int(0.95 * (len(ordered) - 1))],
+                "max": ordered[-1],
+            }
+
+        return {
+            "uptime": time.time() - self.started,
+            "queue_depth": queue.qsize(),
+            "queue_size": queue.maxsize,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "latency": latencies,
+        }
+
+
+class StegoService:
+    ROUTES = {
+        "/embed": (embed_job, ("image", "method", "message")),
+        "/extract": (extract_job, ("image", "method")),
+        "/metrics": (metrics_job, ("original", "embedded")),
+    }
+
+    def __init__(self, workers=None, queue_size=QUEUE_SIZE, store_metrics=True, threads=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.threads = threads
+        self.queue = None
+        self.stats = ServiceStats()
+        self.store_metrics = store_metrics
+        self._executor = None
+        self._dispatchers = []
+
+    async def start(self, host=HOST, port=PORT):
+        loop = asyncio.get_running_loop()
+
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=batch.init_worker,
+                                             initargs=(False, None, None, False, self.threads))
+        await asyncio.gather(*(loop.run_in_executor(self._executor, os.getpid) for _ in range(self.workers)))
+
+        self.queue = asyncio.Queue(self.queue_size)
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def close(self):
+        for dispatcher in self._dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._executor.shutdown()
+
+    async def submit(self, function, request):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((function, request, future))
+        return await future
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            function, request, future = await self.queue.get()
+            self.stats.in_flight += 1
+            try:
+                result = await loop.run_in_executor(self._executor, function, request)
+                if not future.cancelled():
+                    future.set_result(result)
+            except Exception as error:
+                if not future.cancelled():
+                    future.set_exception(error)
+            finally:
+                self.stats.in_flight -= 1
+                self.queue.task_done()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                status, payload = await self._route(method, path, headers, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._write_response(writer, status, payload, keep_alive)
+
+                if not keep_alive:
+                    break
+        except BadRequest as error:
+            self.stats.failed += 1
+            await self._write_response(writer, 400, {"error": str(error)}, False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, headers, body):
+        if path == "/stats":
+            if method != "GET":
+                return 405, {"error": "Use GET."}
+            return 200, self.stats.summary(self.queue)
+
+        if path not in self.ROUTES:
+            return 404, {"error": f"Unknown endpoint: {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST."}
+        if body is None:
+            return 413, {"error": f"Request body is larger than {MAX_BODY_SIZE} bytes."}
+        if headers.get("content-type", "").partition(";")[0].strip().lower() != "application/json":
+            self.stats.failed += 1
+            return 415, {"error": "Content-Type must be application/json."}
+
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError as error:
+            self.stats.failed += 1
+            return 400, {"error": f"Invalid JSON: {error}"}
+
+        if not isinstance(request, dict):
+            self.stats.failed += 1
+            return 400, {"error": "Request body must be a JSON object."}
+
+        function, required = self.ROUTES[path]
+        missing = [field for field in required if field not in request]
+        if missing:
+            self.stats.failed += 1
+            return 400, {"error": f"Missing fields: {', '.join(missing)}"}
+
+        start = time.perf_counter()
+        try:
+            result = await self.submit(function, request)
+        except asyncio.QueueFull:
+            self.stats.rejected += 1
+            return 503, {"error": "Queue is full, retry later."}
+        except (ValueError, FileNotFoundError) as error:
+            self.stats.record(path, time.perf_counter() - start, ok=False)
+            return 400, {"error": str(error)}
+        except Exception as error:
+            self.stats.record(path, time.perf_counter() - start, ok=False)
+            return 500, {"error": f"{type(error).__name__}: {error}"}
+
+        self.stats.record(path, time.perf_counter() - start)
+        return 200, await self._result_payload(path, result)
+
+    async def _result_payload(self, path, result):
+        if path == "/embed":
+            record, output_path = result
+            if self.store_metrics:
+                await asyncio.get_running_loop().run_in_executor(None, lambda: main.save_metrics(**record))
+            return {"output": output_path, "metrics": record}
+
+        if path == "/extract":
+            return {"message": result}
+
+        return {"metrics": result}
+
+    @staticmethod
+    async def _read_request(reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        try:
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise BadRequest("Malformed request line.") from None
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise BadRequest("Content-Length must be an integer.") from None
+        if length < 0:
+            raise BadRequest("Content-Length must not be negative.")
+        if length > MAX_BODY_SIZE:
+            headers["connection"] = "close"
+            return method, path, headers, None
+
+        body = await reader.readexactly(length) if length else b""
+        return method, path, headers, body
+
+    @staticmethod
+    async def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        headers = [
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == 503:
+            headers.append("Retry-After: 1")
+
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(host=HOST, port=PORT, workers=None, queue_size=QUEUE_SIZE, threads=None):
+    service = StegoService(workers, queue_size, threads=threads)
+    server = await service.start(host, port)
+    print(f"Serving on http://{host}:{port} with {service.workers} workers")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve embed/extract/metrics over localhost HTTP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Pending requests before answering 503.")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Threads per worker for the Cb/Cr DWT and metrics (default: serial).")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue_size, args.threads))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,240 @@
+import argparse
+import hashlib
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from bits import BitBuffer
+from dwt import DWT
+from lsb import LSB
+
+SHARD_MAGIC = b'SHRD'
+SHARD_VERSION = 1
+SHARD_HEADER = struct.Struct('>4sB8sHHII32s')
+PAYLOAD_ID_SIZE = 8
+MESSAGE_PLANE = (128, 128)
+
+
+class Shard:
+    def __init__(self, payload_id, index, count, data, digest):
+        self.payload_id = payload_id
+        self.index = index
+        self.count = count
+        self.data = bytes(data)
+        self.digest = digest
+
+    def pack(self):
+        header = SHARD_HEADER.pack(
+            SHARD_MAGIC, SHARD_VERSION, self.payload_id, self.index, self.count,
+            len(self.data), zlib.crc32(self.data), self.digest,
+        )
+        return header + self.data
+
+    @classmethod
+    def unpack(cls, data):
+        magic, version, payload_id, index, count, size, crc, digest = cls._parse_header(data)
+
+        end = SHARD_HEADER.size + size
+        if len(data) < end:
+            raise ValueError(f"Truncated shard: expected {end} bytes, got {len(data)}.")
+
+        body = data[SHARD_HEADER.size:end]
+        if zlib.crc32(body) != crc:
+            raise ValueError(f"Shard {index} of {count} failed its CRC check.")
+
+        return cls(payload_id, index, count, body, digest)
+
+    @classmethod
+    def read(cls, read_bytes):
+        header = read_bytes(SHARD_HEADER.size)
+        size = cls._parse_header(header)[5]
+        return cls.unpack(read_bytes(SHARD_HEADER.size + size))
+
+    @staticmethod
+    def _parse_header(data):
+        if len(data) < SHARD_HEADER.size:
+            raise ValueError("Truncated shard header.")
+
+        fields = SHARD_HEADER.unpack_from(data)
+        magic, version, _, index, count = fields[:5]
+        if magic != SHARD_MAGIC:
+            raise ValueError("No payload shard found.")
+        if version != SHARD_VERSION:
+            raise ValueError(f"Unsupported shard version: {version}")
+        if index >= count:
+            raise ValueError(f"Invalid shard index {index} of {count}.")
+
+        return fields
+
+
+def capacity(width, height):
+    return max(0, width * height * 3 // 8 - SHARD_HEADER.size)
+
+
+def image_capacity(image_path):
+    with Image.open(image_path) as image:
+        return capacity(*image.size)
+
+
+def plan(cover_paths, payload_size, output_paths=None):
+    if output_paths is None:
+        output_paths = [None] * len(cover_paths)
+    elif len(output_paths) != len(cover_paths):
+        raise ValueError(f"Need {len(cover_paths)} output paths, got {len(output_paths)}.")
+
+    allocation = []
+    remaining = payload_size
+
+    for cover_path, output_path in zip(cover_paths, output_paths):
+        if remaining <= 0:
+            break
+
+        size = min(image_capacity(cover_path), remaining)
+        if size:
+            allocation.append((cover_path, output_path, size))
+            remaining -= size
+
+    if remaining > 0:
+        raise ValueError(f"Covers are {remaining} bytes short of a {payload_size}-byte payload.")
+
+    return allocation
+
+
+def split(payload, sizes):
+    payload_id = os.urandom(PAYLOAD_ID_SIZE)
+    digest = hashlib.sha256(payload).digest()
+
+    shards = []
+    offset = 0
+    for index, size in enumerate(sizes):
+        shards.append(Shard(payload_id, index, len(sizes), payload[offset:offset + size], digest))
+        offset += size
+
+    if offset != len(payload):
+        raise ValueError(f"Shard sizes cover {offset} of {len(payload)} bytes.")
+
+    return shards
+
+
+def reassemble(shards):
+    if not shards:
+        raise ValueError("No shards to reassemble.")
+
+    first = shards[0]
+    ordered = [None] * first.count
+
+    for shard in shards:
+        if (shard.payload_id, shard.count, shard.digest) != (first.payload_id, first.count, first.digest):
+            raise ValueError("Shards belong to different payloads.")
+        ordered[shard.index] = shard
+
+    missing = [index for index, shard in enumerate(ordered) if shard is None]
+    if missing:
+        raise ValueError(f"Missing shards: {', '.join(map(str, missing))} of {first.count}.")
+
+    payload = b''.join(shard.data for shard in ordered)
+    if hashlib.sha256(payload).digest() != first.digest:
+        raise ValueError("Reassembled payload failed its SHA-256 check.")
+
+    return payload
+
+
+def message_plane(data):
+    return BitBuffer.from_bytes(data).plane(MESSAGE_PLANE)
+
+
+def embed_shard(job):
+    cover_path, output_path, packed_shard, wavelet = job
+
+    compressed_image = DWT(wavelet).compress_image(cover_path, message_plane(packed_shard), save=False)
+    embedded_image = LSB(compressed_image, packed_shard).apply()
+    embedded_image.save(output_path, optimize=True)
+
+    return output_path
+
+
+def extract_shard(stego_path):
+    with Image.open(stego_path) as image:
+        return Shard.read(LSB(image).read_bytes)
+
+
+def embed(payload, cover_paths, output_paths, workers=None, wavelet='haar'):
+    allocation = plan(cover_paths, len(payload), output_paths)
+    shards = split(payload, [size for _, _, size in allocation])
+
+    jobs = [
+        (cover_path, output_path, shard.pack(), wavelet)
+        for (cover_path, output_path, _), shard in zip(allocation, shards)
+    ]
+
+    return _map(embed_shard, jobs, workers)
+
+
+def extract(stego_paths, workers=None):
+    return reassemble(_map(extract_shard, stego_paths, workers))
+
+
+def _map(function, items, workers):
+    workers = min(workers or os.cpu_count() or 1, len(items))
+
+    if workers <= 1:
+        return list(map(function, items))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, items))
+
+
+def main():
+    import main as pipeline
+    from container import Container
+
+    embedders = {
+        "aes": pipeline.message_embedding_aes,
+        "hybrid": pipeline.message_embedding_hybrid,
+        "rsa": pipeline.message_embedding_rsa,
+    }
+
+    parser = argparse.ArgumentParser(description="Split one encrypted payload across several cover images.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    embed_parser = subparsers.add_parser("embed")
+    embed_parser.add_argument("--method", choices=sorted(embedders), default="hybrid")
+    embed_parser.add_argument("--message-file", required=True)
+    embed_parser.add_argument("--output-dir", required=True)
+    embed_parser.add_argument("--workers", type=int, default=None)
+    embed_parser.add_argument("covers", nargs="+")
+
+    extract_parser = subparsers.add_parser("extract")
+    extract_parser.add_argument("--workers", type=int, default=None)
+    extract_parser.add_argument("stego_images", nargs="+")
+
+    plan_parser = subparsers.add_parser("plan")
+    plan_parser.add_argument("--size", type=int, required=True, help="Payload size in bytes.")
+    plan_parser.add_argument("covers", nargs="+")
+
+    args = parser.parse_args()
+
+    if args.command == "embed":
+        with open(args.message_file, encoding="utf-8") as f:
+            payload = embedders[args.method](f.read())
+
+        os.makedirs(args.output_dir, exist_ok=True)
+        output_paths = [
+            os.path.join(args.output_dir, os.path.splitext(os.path.basename(cover))[0] + f"_shard{index}.png")
+            for index, cover in enumerate(args.covers)
+        ]
+        for path in embed(payload, args.covers, output_paths, args.workers):
+            print(f"Shard saved at: {path}")
+    elif args.command == "extract":
+        container = Container.unpack(extract(args.stego_images, args.workers))
+        print(pipeline.message_extracting(container))
+    else:
+        for cover_path, _, size in plan(args.covers, args.size):
+            print(f"{cover_path}: {size} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import numpy as np
+from PIL import Image
+
+from lsb import LSB
+from metrics.engine import MetricsEngine
+
+MESSAGE_PLANE = (128, 128)
+CHUNK_BYTES = 1 << 20
+
+
+class StackedPipeline:
+    def __init__(self, dwt, level=1):
+        self.dwt = dwt
+        self.level = level
+
+    def embed(self, covers, payloads=None, message_bits=None):
+        covers = self._rgb_stack(covers)
+        stego = np.empty_like(covers)
+
+        if message_bits is None and payloads is not None:
+            message_bits = self.message_planes(payloads)
+
+        count, height, width = covers.shape[:3]
+        step = max(1, CHUNK_BYTES // (height * width * 2 * 8))
+
+        for start in range(0, count, step):
+            chunk = slice(start, start + step)
+
+            bits = message_bits
+            if message_bits is not None and message_bits.ndim == 3:
+                bits = message_bits[chunk]
+
+            stego[chunk] = self._embed_chunk(covers[chunk], bits)
+            if payloads is not None:
+                self.embed_payloads(stego[chunk], payloads[chunk])
+
+        return stego
+
+    def _embed_chunk(self, covers, message_bits):
+        ycbcr = self.convert(covers, 'RGB', 'YCbCr')
+        chroma = np.ascontiguousarray(np.moveaxis(ycbcr[..., 1:], -1, 1))
+
+        processed = self.dwt._process_channels(chroma, self.level, message_bits)
+        ycbcr[..., 1:] = np.moveaxis(processed, 1, -1)
+
+        return self.convert(ycbcr, 'YCbCr', 'RGB')
+
+    def metrics(self, originals, stegos):
+        originals = self._rgb_stack(originals)
+        stegos = self._rgb_stack(stegos)
+        if originals.shape != stegos.shape:
+            raise ValueError("Stacked metrics need stacks with the same shape.")
+
+        difference = self.convert(originals, 'RGB', 'YCbCr').astype(np.int64) - self.convert(stegos, 'RGB', 'YCbCr')
+        mse = np.mean(difference * difference, axis=(1, 2, 3))
+
+        with np.errstate(divide='ignore'):
+            psnr = 10 * np.log10(255 ** 2 / mse)
+
+        ssim = MetricsEngine.ssim_stack(self.convert(originals, 'RGB', 'L'), self.convert(stegos, 'RGB', 'L'))
+
+        return {"mse": mse, "psnr": psnr, "ssim": ssim}
+
+    @staticmethod
+    def convert(stack, mode, target_mode):
+        count, height, width = stack.shape[:3]
+
+        tall = Image.fromarray(stack.reshape(count * height, width, *stack.shape[3:]), mode)
+        converted = np.array(tall.convert(target_mode))
+
+        return converted.reshape(count, height, width, *converted.shape[2:])
+
+    @staticmethod
+    def message_planes(payloads):
+        size = MESSAGE_PLANE[0] * MESSAGE_PLANE[1]
+        bits, mask = StackedPipeline._payload_bits(payloads, size)
+
+        planes = np.zeros((len(payloads), size), dtype=np.uint8)
+        planes[:, :mask.shape[1]][mask] = bits
+        return planes.reshape(len(payloads), *MESSAGE_PLANE)
+
+    @staticmethod
+    def embed_payloads(stego, payloads):
+        flat = stego.reshape(stego.shape[0], -1)
+        bits, mask = StackedPipeline._payload_bits(payloads, flat.shape[1], truncate=False)
+
+        columns = mask.shape[1]
+        region = flat[:, :columns]
+        region[mask] = (region[mask] & 254) | bits
+
+        return stego
+
+    @staticmethod
+    def _payload_bits(payloads, limit, truncate=True):
+        message_bits = []
+        for payload in payloads:
+            bits = LSB.message_bits(payload)
+            if len(bits) > limit and not truncate:
+                raise ValueError(f"Payload of {len(bits) // 8} bytes does not fit in {limit} LSB slots.")
+            message_bits.append(bits[:limit].unpack())
+
+        lengths = np.array([bits.size for bits in message_bits])
+
+        mask = np.arange(lengths.max(initial=0)) < lengths[:, None]
+        return np.concatenate(message_bits) if message_bits else np.empty(0, dtype=np.uint8), mask
+
+    @staticmethod
+    def _rgb_stack(stack):
+        stack = np.asarray(stack, dtype=np.uint8)
+        if stack.ndim != 4:
+            raise ValueError(f"Expected an N x H x W x C stack, got shape {stack.shape}.")
+        return np.ascontiguousarray(stack[..., :3])
@@ -0,0 +1,323 @@
+import io
+import struct
+import zlib
+
+import numpy as np
+from PIL import Image
+
+from lsb import LSB
+from metrics.engine import MetricsEngine
+
+STRIP_ROWS = 256
+BLOCK_LOCAL_WAVELETS = ('haar', 'int_haar')
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_IDAT_SIZE = 1 << 16
+PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+class StripReader:
+    def __init__(self, path):
+        self.path = path
+        self.array = None
+        self.png = None
+        self.image = None
+
+        if path.endswith('.npy'):
+            self.array = np.load(path, mmap_mode='r')
+            self.height, self.width = self.array.shape[:2]
+        elif is_png(path):
+            self.png = PngStripReader(path)
+            self.width, self.height = self.png.width, self.png.height
+        else:
+            try:
+                self.image = Image.open(path)
+            except Image.DecompressionBombError as error:
+                raise ValueError(f"{path} is too large to decode in one piece; convert it to PNG or .npy.") from error
+            self.width, self.height = self.image.size
+
+    def read(self, top, bottom):
+        if self.array is not None:
+            return np.array(self.array[top:bottom, :, :3])
+        if self.png is not None:
+            return self.png.read(top, bottom)
+
+        strip = self.image.crop((0, top, self.width, bottom))
+        return np.asarray(strip.convert('RGB'))
+
+    def strips(self, rows=STRIP_ROWS):
+        for top in range(0, self.height, rows):
+            bottom = min(top + rows, self.height)
+            yield top, self.read(top, bottom)
+
+    def close(self):
+        if self.png is not None:
+            self.png.close()
+        if self.image is not None:
+            self.image.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def is_png(path):
+    with open(path, 'rb') as f:
+        return f.read(len(PNG_SIGNATURE)) == PNG_SIGNATURE
+
+
+class PngStripReader:
+    def __init__(self, path):
+        self.path = path
+        self.rows_read = 0
+        self._file = open(path, 'rb')
+        self._decompressor = zlib.decompressobj()
+        self._buffer = bytearray()
+        self._tail = b''
+        self._palette_chunks = []
+
+        try:
+            self._read_header()
+        except Exception:
+            self._file.close()
+            raise
+
+    def read(self, top, bottom):
+        if top != self.rows_read:
+            raise ValueError(f"PNG strips must be read in order: expected row {self.rows_read}, got {top}.")
+
+        bottom = min(bottom, self.height)
+        count = bottom - top
+        size = count * (self.row_bytes + 1)
+
+        self._fill(size)
+        filtered = bytes(self._buffer[:size])
+        del self._buffer[:size]
+
+        with Image.open(io.BytesIO(self._strip_png(filtered, count))) as image:
+            image.load()
+            rows = np.asarray(image)
+            strip = np.asarray(image.crop((0, 1, self.width, count + 1)).convert('RGB'))
+
+        self._previous = rows[-1].tobytes()
+        self.rows_read = bottom
+        return strip
+
+    def close(self):
+        self._file.close()
+
+    def _read_header(self):
+        if self._file.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+            raise ValueError(f"{self.path} is not a PNG file.")
+
+        chunk_type, data = self._read_chunk()
+        if chunk_type != b'IHDR':
+            raise ValueError(f"{self.path} does not start with an IHDR chunk.")
+
+        self.width, self.height, bit_depth, color_type, _, _, interlace = struct.unpack('>IIBBBBB', data)
+        if bit_depth != 8 or color_type not in PNG_CHANNELS or interlace:
+            raise ValueError(f"Only non-interlaced 8-bit PNG covers can be streamed; convert {self.path} to .npy.")
+
+        self.color_type = color_type
+        self.row_bytes = self.width * PNG_CHANNELS[color_type]
+        self._previous = bytes(self.row_bytes)
+
+        while True:
+            chunk_type, data = self._read_chunk()
+            if chunk_type == b'IDAT':
+                self._tail = data
+                return
+            if chunk_type in (b'PLTE', b'tRNS'):
+                self._palette_chunks.append((chunk_type, data))
+            elif chunk_type == b'IEND':
+                raise ValueError(f"{self.path} has no image data.")
+
+    def _read_chunk(self):
+        header = self._file.read(8)
+        if len(header) != 8:
+            raise ValueError(f"Truncated PNG chunk in {self.path}.")
+
+        length, chunk_type = struct.unpack('>I4s', header)
+        data = self._file.read(length)
+        crc = self._file.read(4)
+        if len(data) != length or len(crc) != 4 or struct.unpack('>I', crc)[0] != zlib.crc32(chunk_type + data):
+            raise ValueError(f"Corrupt {chunk_type.decode('latin-1')} chunk in {self.path}.")
+
+        return chunk_type, data
+
+    def _fill(self, size):
+        while len(self._buffer) < size:
+            if not self._tail:
+                chunk_type, self._tail = self._read_chunk()
+                if chunk_type == b'IEND':
+                    raise ValueError(f"Truncated PNG image data in {self.path}.")
+                if chunk_type != b'IDAT':
+                    self._tail = b''
+                    continue
+
+            self._buffer += self._decompressor.decompress(self._tail, size - len(self._buffer))
+            self._tail = self._decompressor.unconsumed_tail
+
+    def _strip_png(self, filtered, count):
+        # The previous reconstructed row goes first, unfiltered, so PIL can undo Up/Average/Paeth filters.
+        chunks = [(b'IHDR', struct.pack('>IIBBBBB', self.width, count + 1, 8, self.color_type, 0, 0, 0))]
+        chunks += self._palette_chunks
+        chunks.append((b'IDAT', zlib.compress(b'\x00' + self._previous + filtered, 0)))
+        chunks.append((b'IEND', b''))
+
+        png = bytearray(PNG_SIGNATURE)
+        for chunk_type, data in chunks:
+            png += struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+        return bytes(png)
+
+
+class PngStripWriter:
+    def __init__(self, path, width, height, compress_level=6):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = bytearray()
+        self._file = open(path, 'wb')
+
+        self._file.write(PNG_SIGNATURE)
+        self._write_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def write(self, strip):
+        rows = np.zeros((strip.shape[0], 1 + self.width * 3), dtype=np.uint8)
+        rows[:, 1:] = strip.reshape(strip.shape[0], -1)
+
+        self._pending += self._compressor.compress(rows.tobytes())
+        self.rows_written += strip.shape[0]
+        self._flush_idat(PNG_IDAT_SIZE)
+
+    def close(self):
+        if self._file.closed:
+            return
+
+        if self.rows_written != self.height:
+            self._file.close()
+            raise ValueError(f"Expected {self.height} rows, got {self.rows_written}.")
+
+        self._pending += self._compressor.flush()
+        self._flush_idat(1)
+        self._write_chunk(b'IEND', b'')
+        self._file.close()
+
+    def abort(self):
+        self._file.close()
+
+    def _flush_idat(self, threshold):
+        while len(self._pending) >= threshold:
+            data = bytes(self._pending[:PNG_IDAT_SIZE])
+            del self._pending[:PNG_IDAT_SIZE]
+            self._write_chunk(b'IDAT', data)
+
+    def _write_chunk(self, chunk_type, data):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(chunk_type + data)
+        self._file.write(struct.pack('>I', zlib.crc32(chunk_type + data)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class NpyStripWriter:
+    def __init__(self, path, width, height):
+        self.path = path
+        self.array = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(height, width, 3))
+        self.rows_written = 0
+
+    def write(self, strip):
+        self.array[self.rows_written:self.rows_written + strip.shape[0]] = strip
+        self.rows_written += strip.shape[0]
+
+    def close(self):
+        if self.array is not None:
+            self.array.flush()
+            self.array = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_writer(path, width, height):
+    if path.endswith('.npy'):
+        return NpyStripWriter(path, width, height)
+    return PngStripWriter(path, width, height)
+
+
+class TiledPipeline:
+    def __init__(self, dwt, strip_rows=STRIP_ROWS, level=1):
+        if dwt.wavelet not in BLOCK_LOCAL_WAVELETS:
+            raise ValueError(f"Tiled processing needs a block-local wavelet, got {dwt.wavelet}.")
+
+        alignment = 1 << level
+        self.dwt = dwt
+        self.level = level
+        self.strip_rows = max(alignment, strip_rows - strip_rows % alignment)
+
+    def embed(self, cover_path, output_path, message_bits=None, lsb_message=None):
+        lsb_bits = LSB.message_bits(lsb_message) if lsb_message is not None else None
+
+        with StripReader(cover_path) as reader:
+            if lsb_bits is not None and len(lsb_bits) > reader.width * reader.height * 3:
+                raise ValueError(f"Payload of {len(lsb_bits)} bits does not fit in a "
+                                 f"{(reader.width, reader.height)} image.")
+
+            with open_writer(output_path, reader.width, reader.height) as writer:
+                for top, strip in reader.strips(self.strip_rows):
+                    strip = self._embed_strip(strip, top, message_bits)
+
+                    if lsb_bits is not None:
+                        LSB.embed_bits(strip, lsb_bits, top * reader.width * 3)
+
+                    writer.write(strip)
+
+        return output_path
+
+    def _embed_strip(self, strip, top, message_bits):
+        y, cb, cr = [np.array(c) for c in Image.fromarray(strip).convert('YCbCr').split()]
+
+        cb_comp, cr_comp = self.dwt._process_channels(np.stack([cb, cr]), self.level, message_bits, top // 2)
+
+        final_img_ycbcr = Image.merge('YCbCr', (
+            Image.fromarray(y),
+            Image.fromarray(cb_comp),
+            Image.fromarray(cr_comp)
+        ))
+
+        return np.array(final_img_ycbcr.convert('RGB'))
+
+    def mse(self, original_path, embedded_path):
+        squared_error = 0
+        samples = 0
+
+        with StripReader(original_path) as original, StripReader(embedded_path) as embedded:
+            if (original.width, original.height) != (embedded.width, embedded.height):
+                raise ValueError("Tiled MSE needs images with the same dimensions.")
+
+            for (top, original_strip), (_, embedded_strip) in zip(
+                    original.strips(self.strip_rows), embedded.strips(self.strip_rows)):
+                original_ycbcr = np.asarray(Image.fromarray(original_strip).convert('YCbCr'), dtype=np.int64)
+                embedded_ycbcr = np.asarray(Image.fromarray(embedded_strip).convert('YCbCr'), dtype=np.int64)
+
+                difference = original_ycbcr - embedded_ycbcr
+                squared_error += int(np.sum(difference * difference))
+                samples += difference.size
+
+        return squared_error / samples
+
+    def psnr(self, original_path, embedded_path):
+        return MetricsEngine.psnr(self.mse(original_path, embedded_path))
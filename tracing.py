@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import time
+
+from atomic import atomic_write
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "args", "start", "depth")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.depth = self.tracer._push()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.tracer._pop()
+        self.tracer._record(self, end - self.start)
+        return False
+
+
+class Tracer:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._events = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def mark(self):
+        return len(self._events)
+
+    def events(self, since=0):
+        with self._lock:
+            return self._events[since:]
+
+    def drain(self):
+        with self._lock:
+            events, self._events = self._events, []
+        return events
+
+    def extend(self, events):
+        with self._lock:
+            self._events.extend(events)
+
+    def totals(self, since=0):
+        totals = {}
+        for event in self.events(since):
+            totals[event["name"]] = totals.get(event["name"], 0.0) + event["dur"] / 1e9
+        return totals
+
+    def export_chrome(self, path):
+        trace = {
+            "traceEvents": [
+                {
+                    "name": event["name"],
+                    "cat": "stego",
+                    "ph": "X",
+                    "ts": event["ts"] / 1e3,
+                    "dur": event["dur"] / 1e3,
+                    "pid": event["pid"],
+                    "tid": event["tid"],
+                    "args": event["args"],
+                }
+                for event in self.events()
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+        with atomic_write(path) as f:
+            json.dump(trace, f)
+
+    def _push(self):
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        return depth
+
+    def _pop(self):
+        self._local.depth -= 1
+
+    def _record(self, span, duration):
+        event = {
+            "name": span.name,
+            "ts": span.start,
+            "dur": duration,
+            "depth": span.depth,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": span.args,
+        }
+        with self._lock:
+            self._events.append(event)
+
+
+TRACER = Tracer()
+
+
+def span(name, **args):
+    return TRACER.span(name, **args)
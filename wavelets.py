@@ -0,0 +1,202 @@
+import numpy as np
+
+HAAR_GAIN = 0.7071067811865476
+
+
+class PyWaveletsBackend:
+    integer = False
+
+    def __init__(self, wavelet):
+        self.wavelet = wavelet
+
+    def analysis(self, channels, level):
+        import pywt
+        return pywt.wavedec2(channels, self.wavelet, level=level, axes=(-2, -1))
+
+    def synthesis(self, coeffs):
+        import pywt
+        return pywt.waverec2(coeffs, self.wavelet, axes=(-2, -1))
+
+    @staticmethod
+    def detail_bands(coeffs):
+        return list(coeffs[-1])
+
+    @staticmethod
+    def set_detail_bands(coeffs, bands):
+        coeffs[-1] = tuple(bands)
+
+
+class HaarBackend(PyWaveletsBackend):
+    def __init__(self):
+        super().__init__('haar')
+
+    def analysis(self, channels, level):
+        cA = channels.astype(np.float64)
+        details = []
+        for _ in range(level):
+            cA, bands = _haar_dwt2(cA)
+            details.insert(0, bands)
+
+        return [cA] + details
+
+    def synthesis(self, coeffs):
+        cA, *details = coeffs
+        for bands in details:
+            height, width = bands[0].shape[-2:]
+            cA = _haar_idwt2(cA[..., :height, :width], bands)
+
+        return cA
+
+
+class LiftingBackend:
+    integer = True
+
+    def analysis(self, channels, level):
+        data = channels.astype(np.int32)
+
+        approximation = data
+        for _ in range(level):
+            self._forward(approximation, -2)
+            self._forward(approximation, -1)
+            approximation = approximation[..., 0::2, 0::2]
+
+        return data, level
+
+    def synthesis(self, state):
+        data, level = state
+
+        for depth in reversed(range(level)):
+            step = 1 << depth
+            approximation = data[..., ::step, ::step]
+            self._inverse(approximation, -1)
+            self._inverse(approximation, -2)
+
+        return data
+
+    @staticmethod
+    def detail_bands(state):
+        data, _ = state
+        return [data[..., 1::2, 0::2], data[..., 0::2, 1::2], data[..., 1::2, 1::2]]
+
+    @staticmethod
+    def set_detail_bands(state, bands):
+        for view, band in zip(LiftingBackend.detail_bands(state), bands):
+            if view is not band:
+                view[...] = band
+
+    @staticmethod
+    def _split(data, axis):
+        samples = np.moveaxis(data, axis, -1)
+        return samples[..., 0::2], samples[..., 1::2]
+
+
+class IntegerHaarBackend(LiftingBackend):
+    @staticmethod
+    def _forward(data, axis):
+        even, odd = LiftingBackend._split(data, axis)
+        pairs = odd.shape[-1]
+
+        odd -= even[..., :pairs]
+        even[..., :pairs] += odd >> 1
+
+    @staticmethod
+    def _inverse(data, axis):
+        even, odd = LiftingBackend._split(data, axis)
+        pairs = odd.shape[-1]
+
+        even[..., :pairs] -= odd >> 1
+        odd += even[..., :pairs]
+
+
+class Integer53Backend(LiftingBackend):
+    @staticmethod
+    def _forward(data, axis):
+        even, odd = LiftingBackend._split(data, axis)
+        if not odd.shape[-1]:
+            return
+
+        odd -= Integer53Backend._predict(even, odd)
+        even += Integer53Backend._update(even, odd)
+
+    @staticmethod
+    def _inverse(data, axis):
+        even, odd = LiftingBackend._split(data, axis)
+        if not odd.shape[-1]:
+            return
+
+        even -= Integer53Backend._update(even, odd)
+        odd += Integer53Backend._predict(even, odd)
+
+    @staticmethod
+    def _predict(even, odd):
+        pairs = odd.shape[-1]
+        if even.shape[-1] > pairs:
+            right = even[..., 1:pairs + 1]
+        else:
+            right = np.concatenate([even[..., 1:], even[..., -1:]], axis=-1)
+
+        return (even[..., :pairs] + right) >> 1
+
+    @staticmethod
+    def _update(even, odd):
+        left = np.concatenate([odd[..., :1], odd[..., :-1]], axis=-1)
+        if even.shape[-1] > odd.shape[-1]:
+            left = np.concatenate([left, odd[..., -1:]], axis=-1)
+            odd = np.concatenate([odd, odd[..., -1:]], axis=-1)
+
+        return (left + odd + 2) >> 2
+
+
+BACKENDS = {
+    'int_haar': IntegerHaarBackend,
+    'int_53': Integer53Backend,
+}
+
+
+def get_backend(wavelet):
+    if wavelet in BACKENDS:
+        return BACKENDS[wavelet]()
+    if wavelet == 'haar':
+        return HaarBackend()
+    return PyWaveletsBackend(wavelet)
+
+
+def _haar_dwt_axis(data, axis):
+    if data.shape[axis] % 2:
+        data = np.concatenate([data, np.take(data, [-1], axis=axis)], axis=axis)
+
+    scaled = HAAR_GAIN * data
+    index = (slice(None),) * (axis % data.ndim)
+    even = scaled[index + (slice(0, None, 2),)]
+    odd = scaled[index + (slice(1, None, 2),)]
+
+    return even + odd, even - odd
+
+
+def _haar_idwt_axis(approximation, detail, axis):
+    scaled_approximation = HAAR_GAIN * approximation
+    scaled_detail = HAAR_GAIN * detail
+
+    shape = list(approximation.shape)
+    shape[axis] *= 2
+    data = np.empty(shape, dtype=np.float64)
+
+    index = (slice(None),) * (axis % data.ndim)
+    data[index + (slice(0, None, 2),)] = scaled_approximation + scaled_detail
+    data[index + (slice(1, None, 2),)] = scaled_approximation - scaled_detail
+
+    return data
+
+
+def _haar_dwt2(data):
+    low, high = _haar_dwt_axis(data, -2)
+    cA, cV = _haar_dwt_axis(low, -1)
+    cH, cD = _haar_dwt_axis(high, -1)
+    return cA, (cH, cV, cD)
+
+
+def _haar_idwt2(cA, bands):
+    cH, cV, cD = bands
+    low = _haar_idwt_axis(cA, cV, -1)
+    high = _haar_idwt_axis(cH, cD, -1)
+    return _haar_idwt_axis(low, high, -2)